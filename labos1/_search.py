@@ -209,8 +209,54 @@ def nullHeuristic(position, problem=None, info={}):
     """
     return 0
 
-def aStarSearch(problem, heuristic=nullHeuristic):
-    """Search the node that has the lowest combined cost and heuristic first."""
+HEURISTIC_CACHE_SIZE = 100000
+
+class CachedHeuristic:
+    """
+    Wraps a heuristic so that it is computed once per distinct state; later
+    calls with an equal state are answered from a util.BoundedCache.  States
+    are keyed with util.hashableKey, so states holding lists work too.  The
+    wrapped heuristic must depend only on the state and the problem.
+    """
+    def __init__(self, heuristic, maxSize=HEURISTIC_CACHE_SIZE, eviction='lru'):
+        self.heuristic = heuristic
+        self.cache = util.BoundedCache(maxSize, eviction)
+
+    def __call__(self, state, problem=None):
+        key = util.hashableKey(state)
+        value = self.cache.get(key)
+        if value == None:
+            value = self.heuristic(state, problem)
+            self.cache.put(key, value)
+        return value
+
+    def __str__(self):
+        return 'heuristic cache: ' + str(self.cache)
+
+def getCachedHeuristic(problem, heuristic, maxSize=HEURISTIC_CACHE_SIZE, eviction='lru'):
+    """
+    Returns heuristic wrapped in a CachedHeuristic.  Problems with a
+    heuristicInfo dictionary keep it there, under 'heuristicCache', so that
+    later searches on the same problem reuse the cached values.
+    """
+    info = getattr(problem, 'heuristicInfo', None)
+    if info == None:
+        return CachedHeuristic(heuristic, maxSize, eviction)
+    cached = info.get('heuristicCache')
+    if cached == None or cached.heuristic != heuristic:
+        cached = info['heuristicCache'] = CachedHeuristic(heuristic, maxSize, eviction)
+    return cached
+
+def aStarSearch(problem, heuristic=nullHeuristic, cacheSize=HEURISTIC_CACHE_SIZE, eviction='lru'):
+    """
+    Search the node that has the lowest combined cost and heuristic first.
+
+    Heuristic values are cached per state (see CachedHeuristic); cacheSize
+    bounds the cache (None for no bound, 0 for no caching) and eviction is
+    'lru' or 'fifo'.
+    """
+    if cacheSize != 0 and heuristic != nullHeuristic and not isinstance(heuristic, CachedHeuristic):
+        heuristic = getCachedHeuristic(problem, heuristic, cacheSize, eviction)
     "*** YOUR CODE HERE ***"
     currentNode = SearchNode(position = problem.getStartState())
     open = util.PriorityQueue() #stog sadrzi searchNode-ove
@@ -231,8 +277,23 @@ def aStarSearch(problem, heuristic=nullHeuristic):
     return []
     "*** YOUR CODE HERE ***"
 
+def hierarchicalSearch(problem):
+    """
+    Hierarchical path-finding (HPA*, see hierarchicalPathfinding.py) for
+    problems with a single goal position on a maze with unit step costs,
+    such as PositionSearchProblem.  Plans over clusters of the maze, so the
+    path may be slightly longer than the shortest one.
+    """
+    from hierarchicalPathfinding import getHierarchy
+    hierarchy = getHierarchy(problem.walls)
+    actions = hierarchy.findPath(problem.getStartState(), problem.goal)
+    if '_expanded' in dir(problem): problem._expanded += hierarchy.expanded
+    if actions == None: return []
+    return actions
+
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+hpa = hierarchicalSearch
@@ -116,6 +116,7 @@ class SearchAgent(Agent):
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if 'heuristicCache' in getattr(problem, 'heuristicInfo', {}): print(problem.heuristicInfo['heuristicCache'])
 
     def getAction(self, state):
         """
@@ -193,14 +194,9 @@ class PositionSearchProblem(search.SearchProblem):
         """
 
         successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        for nextState, action in Actions.getAdjacency(self.walls).successors[state]:
+            cost = self.costFn(nextState)
+            successors.append( ( nextState, action, cost) )
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
@@ -226,6 +222,150 @@ class PositionSearchProblem(search.SearchProblem):
             cost += self.costFn((x,y))
         return cost
 
+class JunctionSearchProblem(PositionSearchProblem):
+    """
+    A PositionSearchProblem over the junction graph of the maze (see
+    game.JunctionGraph): a successor follows a whole corridor to the next
+    junction, dead end, start or goal, and its action is the tuple of
+    single-step actions along the corridor.  The costs are the same sums of
+    costFn, so uniform cost and A* search still find optimal paths, with far
+    fewer expansions.  Use expandActions (or JunctionSearchAgent) to turn a
+    solution back into single steps.
+    """
+
+    def __init__(self, gameState, costFn = lambda x: 1, goal=(1,1), start=None, warn=True, visualize=True):
+        PositionSearchProblem.__init__(self, gameState, costFn, goal, start, warn, visualize)
+        self.graph = Actions.getAdjacency(self.walls).getJunctionGraph()
+        self.stops = set([self.startState, self.goal])
+        # Junctions whose corridors run through the start or the goal have to
+        # stop there, so their successors are walked instead of looked up
+        self.splitJunctions = set()
+        for stop in self.stops:
+            for junction, k in self.graph.corridorsThrough.get(stop, []):
+                self.splitJunctions.add(junction)
+        self._corridorCosts = {}
+
+    def getSuccessors(self, state):
+        "Returns (nextState, actions, cost) triples, one per corridor out of state."
+        graph = self.graph
+        successors = []
+        if state in graph.junctions and state not in self.splitJunctions:
+            for k, (end, actions, cells) in enumerate(graph.corridors[state]):
+                if (state, k) not in self._corridorCosts:
+                    self._corridorCosts[(state, k)] = sum([self.costFn(cell) for cell in cells])
+                successors.append( ( end, actions, self._corridorCosts[(state, k)] ) )
+        else:
+            for move in graph.successors[state]:
+                end, actions, cells = graph.walk(state, move, self.stops)
+                successors.append( ( end, actions, sum([self.costFn(cell) for cell in cells]) ) )
+
+        # Bookkeeping for display purposes
+        self._expanded += 1 # DO NOT CHANGE
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return successors
+
+    def expandActions(actions):
+        "Flattens a list of corridor actions into single steps."
+        if actions == None: return None
+        steps = []
+        for action in actions:
+            if type(action) == tuple: steps.extend(action)
+            else: steps.append(action)
+        return steps
+    expandActions = staticmethod(expandActions)
+
+    def getCostOfActions(self, actions):
+        return PositionSearchProblem.getCostOfActions(self, self.expandActions(actions))
+
+class JunctionSearchAgent(SearchAgent):
+    """
+    A SearchAgent that searches the junction graph of the maze, by default
+    with uniform cost search:
+
+    > python pacman.py -l bigMaze -p JunctionSearchAgent -a fn=astar,heuristic=manhattanHeuristic
+    """
+    def __init__(self, fn='uniformCostSearch', heuristic='nullHeuristic'):
+        SearchAgent.__init__(self, fn, 'JunctionSearchProblem', heuristic)
+
+    def registerInitialState(self, state):
+        SearchAgent.registerInitialState(self, state)
+        self.actions = JunctionSearchProblem.expandActions(self.actions)
+
+class DStarLiteAgent(Agent):
+    """
+    Walks to a goal position (by default (1,1), like PositionSearchProblem)
+    and replans before every move with D* Lite (see dStarLite.py).  Cells
+    within ghostRadius of a ghost that is not scared cost ghostCost to enter
+    ('inf' blocks them), and walls that appear or disappear are noticed.
+    Instead of searching again from scratch, the planner repairs the part of
+    its search that the changes affect.
+
+    > python pacman.py -l mediumClassic -p DStarLiteAgent -a goalX=1,goalY=9 -g DirectionalGhost
+    """
+    def __init__(self, goalX='1', goalY='1', ghostRadius='1', ghostCost='inf'):
+        self.goal = (int(goalX), int(goalY))
+        self.ghostRadius = int(ghostRadius)
+        self.ghostCost = float(ghostCost)
+        self.planner = None
+
+    def registerInitialState(self, state):
+        from dStarLite import DStarLite
+        starttime = time.time()
+        self.walls = state.getWalls().copy()
+        self.planner = DStarLite(self.walls, state.getPacmanPosition(), self.goal)
+        self.ghostCells = set()
+        self.replans = 0
+        self.observe(state)
+        self.planner.computeShortestPath()
+        print('Path found with total cost of %s in %.1f seconds' % (self.planner.getDistance(), time.time() - starttime))
+        print('Search nodes expanded: %d' % self.planner.expanded)
+
+    def observe(self, state):
+        "Passes changed walls and ghost positions on to the planner."
+        walls = state.getWalls()
+        if not walls == self.walls:
+            changed = []
+            for x in range(walls.width):
+                if walls[x] == self.walls[x]: continue
+                for y in range(walls.height):
+                    if walls[x][y] != self.walls[x][y]:
+                        self.walls[x][y] = walls[x][y]
+                        changed.append((x, y))
+            self.walls.wallsChanged(changed)
+            self.planner.setWalls(changed)
+
+        ghostCells = set()
+        for ghostState in state.getGhostStates():
+            if ghostState.scaredTimer > 0: continue
+            gx, gy = util.nearestPoint(ghostState.getPosition())
+            radius = self.ghostRadius
+            for x in range(max(gx - radius, 0), min(gx + radius + 1, self.walls.width)):
+                for y in range(max(gy - radius, 0), min(gy + radius + 1, self.walls.height)):
+                    if abs(x - gx) + abs(y - gy) <= radius: ghostCells.add((x, y))
+        changes = {}
+        for cell in self.ghostCells - ghostCells: changes[cell] = None
+        for cell in ghostCells - self.ghostCells: changes[cell] = self.ghostCost
+        self.ghostCells = ghostCells
+        if changes: self.planner.setCosts(changes)
+
+    def getAction(self, state):
+        planner = self.planner
+        planner.moveTo(state.getPacmanPosition())
+        expanded = planner.expanded
+        self.observe(state)
+        planner.computeShortestPath()
+        if planner.expanded > expanded: self.replans += 1
+        action = planner.getNextAction()
+        if action == None or action not in state.getLegalPacmanActions():
+            return Directions.STOP
+        return action
+
+    def final(self, state):
+        print('D* Lite expanded %d search nodes, replanning %d times' % (self.planner.expanded, self.replans))
+
 class StayEastSearchAgent(SearchAgent):
     """
     An agent for position search with a cost function that penalizes being in
@@ -285,6 +425,7 @@ class CornersProblem(search.SearchProblem):
             if not startingGameState.hasFood(*corner):
                 print 'Warning: no food in corner ' + str(corner)
         self._expanded = 0 # DO NOT CHANGE; Number of search nodes expanded
+        self.heuristicInfo = {} # A dictionary for the heuristic to store information
         # Please add any code here which you would like to use
         # in initializing the problem
         "*** YOUR CODE HERE ***"
@@ -325,21 +466,15 @@ class CornersProblem(search.SearchProblem):
 
         successors = []
         visitedCorners = state[1]
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            # Add a successor state to the successor list if the action is legal
-            # Here's a code snippet for figuring out whether a new position hits a wall:
-            "*** YOUR CODE HERE ***"
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            hitsWall = self.walls[nextx][nexty]
-            if not hitsWall:
-                if (nextx, nexty) in self.corners and (nextx, nexty) not in visitedCorners:
-                    newCorner = visitedCorners + [(nextx, nexty)]
-                    successors.append((((nextx, nexty), newCorner), action, 1))
-                else:
-                    successors.append((((nextx, nexty), visitedCorners), action, 1))
-            "*** YOUR CODE HERE ***"
+        # The legal moves from each position come from the layout's adjacency table
+        "*** YOUR CODE HERE ***"
+        for nextPosition, action in Actions.getAdjacency(self.walls).successors[state[0]]:
+            if nextPosition in self.corners and nextPosition not in visitedCorners:
+                newCorner = visitedCorners + [nextPosition]
+                successors.append(((nextPosition, newCorner), action, 1))
+            else:
+                successors.append(((nextPosition, visitedCorners), action, 1))
+        "*** YOUR CODE HERE ***"
 
         self._expanded += 1 # DO NOT CHANGE
         return successors
@@ -414,14 +549,10 @@ class FoodSearchProblem:
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
-                successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
+        for (nextx, nexty), direction in Actions.getAdjacency(self.walls).successors[state[0]]:
+            nextFood = state[1].copy()
+            nextFood[nextx][nexty] = False
+            successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
         return successors
 
     def getCostOfActions(self, actions):
@@ -574,7 +705,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         return False
         "*** YOUR CODE HERE ***"
 
-def mazeDistance(point1, point2, gameState):
+def mazeDistance(point1, point2, gameState, backend='bfs'):
     """
     Returns the maze distance between any two points, using the search functions
     you have already built. The gameState can be any game state -- Pacman's
@@ -582,6 +713,10 @@ def mazeDistance(point1, point2, gameState):
 
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
+    With backend='hpa' the distance comes from the cluster hierarchy of the
+    maze (see hierarchicalPathfinding.py), which is much faster on large
+    mazes but may slightly overestimate.
+
     This might be a useful helper function for your ApproximateSearchAgent.
     """
     x1, y1 = point1
@@ -589,5 +724,9 @@ def mazeDistance(point1, point2, gameState):
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
+    if backend == 'hpa':
+        from hierarchicalPathfinding import getHierarchy
+        return getHierarchy(walls).getDistance(point1, point2)
+    if backend != 'bfs': raise Exception('Unknown mazeDistance backend ' + backend)
     prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
     return len(search.bfs(prob))
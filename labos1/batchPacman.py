@@ -0,0 +1,443 @@
+# batchPacman.py
+# --------------
+"""
+A vectorized simulator that plays many classic Pacman games at once.
+
+runGames in pacman.py plays one game after another through Game.run, building
+a new GameState object for every move.  When an agent has to be evaluated over
+thousands of games (or a learner needs lots of episodes), that object churn
+dominates the run time.  BatchGames keeps N games on the same layout as NumPy
+arrays instead:
+
+  pacman positions      (N,)      integers
+  ghost positions       (N, G)    integers in half-cell units (scared ghosts
+                                  move at half speed)
+  food, capsules        (N, W, H) boolean bitplanes
+  scared timers, score  (N, G), (N,)
+
+and advances all of them with one call to step().  The rules mirror
+PacmanRules and GhostRules in pacman.py and the ghost policies mirror
+RandomGhost and DirectionalGhost in ghostAgents.py.
+
+To simulate 1000 games against directional ghosts with a random Pacman:
+
+> python batchPacman.py -l mediumClassic -n 1000 -g DirectionalGhost
+
+By default the ghosts sample from one NumPy generator.  Given a
+util.RandomStream instead, ghost g of game i draws from
+streams.split(i).split(g + 1), the stream runGames in pacman.py hands the same
+ghost, and its moves are then identical to those of the serial game.
+"""
+
+from game import Directions, Actions
+import layout, util
+import sys, time
+
+try:
+    import numpy
+    _NUMPY_ENABLED = True
+except:
+    _NUMPY_ENABLED = False
+
+# Action indices used throughout the batch simulator
+NORTH, SOUTH, EAST, WEST, STOP = range(5)
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+ACTION_INDEX = dict([(action, i) for i, action in enumerate(ACTIONS)])
+DX = [0, 0, 1, -1, 0]
+DY = [1, -1, 0, 0, 0]
+REVERSE = [SOUTH, NORTH, WEST, EAST, STOP]
+
+# util.sample walks a distribution in sorted key order:
+# East, North, South, Stop, West
+SAMPLE_ORDER = sorted(range(5), key=lambda i: ACTIONS[i])
+
+# These must match the constants in pacman.py
+SCARED_TIME = 40
+TIME_PENALTY = 1
+
+class BatchGames:
+    """
+    N classic Pacman games on a single layout, stepped in lockstep.
+
+    Each call to step() plays one round: Pacman moves in every game that is
+    still running, then each ghost moves in turn.  As in Game.run, a game stops
+    as soon as it is won or lost, even in the middle of a round.
+    """
+
+    def __init__(self, layout, numGames, ghostType='RandomGhost', numGhosts=4, seed=None,
+                 prob_attack=0.8, prob_scaredFlee=0.8, streams=None):
+        if not _NUMPY_ENABLED:
+            raise Exception('The batch simulator requires numpy')
+        if ghostType not in ('RandomGhost', 'DirectionalGhost'):
+            raise Exception('No vectorized policy for ghost type ' + ghostType)
+        self.layout = layout
+        self.numGames = numGames
+        self.ghostType = ghostType
+        self.prob_attack = prob_attack
+        self.prob_scaredFlee = prob_scaredFlee
+        self.random = numpy.random.RandomState(seed)
+        self.streams = streams
+        self.sampleTables = {}
+
+        width, height = layout.width, layout.height
+        self.walls = numpy.zeros((width, height), dtype=bool)
+        for x, y in layout.walls.asList():
+            self.walls[x, y] = True
+
+        # openDirections[x, y, a] is True if action a is possible from (x, y)
+        self.openDirections = numpy.zeros((width, height, 5), dtype=bool)
+        self.openDirections[:, :, STOP] = True
+        padded = numpy.ones((width + 2, height + 2), dtype=bool)
+        padded[1:-1, 1:-1] = self.walls
+        for a in (NORTH, SOUTH, EAST, WEST):
+            self.openDirections[:, :, a] = ~padded[1 + DX[a]:width + 1 + DX[a], 1 + DY[a]:height + 1 + DY[a]]
+
+        pacmanStarts = [pos for isPacman, pos in layout.agentPositions if isPacman]
+        ghostStarts = [pos for isPacman, pos in layout.agentPositions if not isPacman]
+        ghostStarts = ghostStarts[:min(numGhosts, layout.getNumGhosts())]
+        self.numGhosts = len(ghostStarts)
+        self.pacmanStart = pacmanStarts[0]
+        self.ghostStartX2 = numpy.array([2 * x for x, y in ghostStarts], dtype=int)
+        self.ghostStartY2 = numpy.array([2 * y for x, y in ghostStarts], dtype=int)
+
+        self.food = numpy.zeros((width, height), dtype=bool)
+        for x, y in layout.food.asList():
+            self.food[x, y] = True
+        self.capsules = numpy.zeros((width, height), dtype=bool)
+        for x, y in layout.capsules:
+            self.capsules[x, y] = True
+        self.reset()
+
+    def reset(self):
+        "Puts every game back into the layout's starting position."
+        n, g = self.numGames, self.numGhosts
+        self.pacmanX = numpy.empty(n, dtype=int)
+        self.pacmanY = numpy.empty(n, dtype=int)
+        self.pacmanX[:], self.pacmanY[:] = self.pacmanStart
+        self.pacmanDirection = numpy.empty(n, dtype=int)
+        self.pacmanDirection[:] = STOP
+        self.ghostX2 = numpy.tile(self.ghostStartX2, (n, 1))
+        self.ghostY2 = numpy.tile(self.ghostStartY2, (n, 1))
+        self.ghostDirection = numpy.empty((n, g), dtype=int)
+        self.ghostDirection[:] = STOP
+        self.scaredTimers = numpy.zeros((n, g), dtype=int)
+        self.foodGrids = numpy.tile(self.food, (n, 1, 1))
+        self.capsuleGrids = numpy.tile(self.capsules, (n, 1, 1))
+        self.numFood = numpy.empty(n, dtype=int)
+        self.numFood[:] = self.food.sum()
+        self.scores = numpy.zeros(n, dtype=int)
+        self.numMoves = numpy.zeros(n, dtype=int)
+        self.win = numpy.zeros(n, dtype=bool)
+        self.lose = numpy.zeros(n, dtype=bool)
+        if self.streams != None:
+            self.ghostStreams = [[self.streams.split(i).split(ghost + 1) for ghost in range(g)] for i in range(n)]
+
+    def isOver(self):
+        return self.win | self.lose
+
+    def allOver(self):
+        return bool(self.isOver().all())
+
+    ##################
+    # Legal actions  #
+    ##################
+
+    def getLegalPacmanMask(self):
+        """
+        Returns an (N, 5) boolean array; entry [i, a] is True if action a is
+        legal for Pacman in game i.  Finished games have no legal actions.
+        """
+        mask = self.openDirections[self.pacmanX, self.pacmanY]
+        mask[self.isOver()] = False
+        return mask
+
+    def getLegalGhostMask(self, ghost):
+        """
+        Returns an (N, 5) boolean array of legal actions for ghost number
+        'ghost' (0-based, agent index ghost + 1), following
+        GhostRules.getLegalActions.
+        """
+        x2, y2 = self.ghostX2[:, ghost], self.ghostY2[:, ghost]
+        direction = self.ghostDirection[:, ghost]
+        rows = numpy.arange(self.numGames)
+        onGrid = ((x2 | y2) & 1) == 0
+
+        mask = self.openDirections[x2 // 2, y2 // 2].copy()
+        mask[:, STOP] = False
+        reverse = numpy.array(REVERSE)[direction]
+        canTurn = mask.sum(axis=1) > 1
+        mask[rows[canTurn], reverse[canTurn]] = False
+
+        # In between grid points a ghost must continue straight
+        mask[~onGrid] = False
+        mask[rows[~onGrid], direction[~onGrid]] = True
+        return mask
+
+    ##################
+    # Ghost policies #
+    ##################
+
+    def getGhostDistribution(self, ghost, legal):
+        "Returns an (N, 5) array of action probabilities for one ghost."
+        legalCount = legal.sum(axis=1).astype(float)
+        legalCount[legalCount == 0] = 1.0
+        if self.ghostType == 'RandomGhost':
+            return legal / legalCount[:, None]
+
+        # DirectionalGhost: rush Pacman, or flee when scared
+        best, scared = self.getGhostBest(ghost, legal)
+        bestProb = numpy.where(scared, self.prob_scaredFlee, self.prob_attack)
+
+        bestCount = best.sum(axis=1).astype(float)
+        bestCount[bestCount == 0] = 1.0
+        dist = best * (bestProb / bestCount)[:, None] + legal * ((1 - bestProb) / legalCount)[:, None]
+        total = dist.sum(axis=1)
+        total[total == 0] = 1.0
+        return dist / total[:, None]
+
+    def getGhostBest(self, ghost, legal):
+        """
+        Returns an (N, 5) mask of the legal actions DirectionalGhost prefers
+        (all False for RandomGhost) and whether each ghost is scared.
+        """
+        scared = self.scaredTimers[:, ghost] > 0
+        if self.ghostType == 'RandomGhost':
+            return numpy.zeros(legal.shape, dtype=bool), scared
+        step = numpy.where(scared, 1, 2)
+        newX2 = self.ghostX2[:, ghost][:, None] + step[:, None] * numpy.array(DX)[None, :]
+        newY2 = self.ghostY2[:, ghost][:, None] + step[:, None] * numpy.array(DY)[None, :]
+        distances = (numpy.abs(newX2 - 2 * self.pacmanX[:, None]) +
+                     numpy.abs(newY2 - 2 * self.pacmanY[:, None]))
+        fleeScore = numpy.where(legal, distances, -1).max(axis=1)
+        attackScore = numpy.where(legal, distances, sys.maxint).min(axis=1)
+        bestScore = numpy.where(scared, fleeScore, attackScore)
+        return legal & (distances == bestScore[:, None]), scared
+
+    def getSampleTable(self, legalBits, bestBits, scared):
+        """
+        The cumulative distribution util.sample walks for a ghost with the given
+        legal and best actions (as bitmasks of action indices), padded to five
+        entries, and the action index of each entry.  It is built with the
+        ghost agents' own Counter arithmetic so the sums match to the last bit.
+        """
+        key = (legalBits, bestBits, scared)
+        if key not in self.sampleTables:
+            legalActions = [a for a, vector in Actions._directionsAsList if legalBits & (1 << ACTION_INDEX[a])]
+            bestActions = [a for a in legalActions if bestBits & (1 << ACTION_INDEX[a])]
+            dist = util.Counter()
+            if self.ghostType == 'RandomGhost':
+                for a in legalActions: dist[a] = 1.0
+            else:
+                bestProb = self.prob_scaredFlee if scared else self.prob_attack
+                for a in bestActions: dist[a] = bestProb / len(bestActions)
+                for a in legalActions: dist[a] += ( 1-bestProb ) / len(legalActions)
+            dist.normalize()
+            items = sorted(dist.items())
+            distribution = [i[1] for i in items]
+            if sum(distribution) != 1:
+                distribution = util.normalize(distribution)
+            cdf, total = [], 0
+            for i in range(len(distribution)):
+                total = distribution[0] if i == 0 else total + distribution[i]
+                cdf.append(total)
+            cdf += [2.0] * (5 - len(cdf))
+            actions = [ACTION_INDEX[i[0]] for i in items] + [STOP] * (5 - len(items))
+            self.sampleTables[key] = (numpy.array(cdf), numpy.array(actions))
+        return self.sampleTables[key]
+
+    def sampleGhostActions(self, ghost, legal, active):
+        """
+        Samples the ghost's action in every active game from the games' own
+        random streams, exactly as GhostAgent.getAction would.
+        """
+        best, scared = self.getGhostBest(ghost, legal)
+        bits = 1 << numpy.arange(5)
+        legalBits, bestBits = legal.dot(bits), best.dot(bits)
+        actions = numpy.empty(self.numGames, dtype=int)
+        actions[:] = STOP
+        for i in numpy.nonzero(active)[0]:
+            cdf, tableActions = self.getSampleTable(int(legalBits[i]), int(bestBits[i]), bool(scared[i]))
+            choice = self.ghostStreams[i][ghost].random()
+            actions[i] = tableActions[min((choice > cdf).sum(), 4)]
+        return actions
+
+    def sampleActions(self, dist):
+        """
+        Samples one action per game from an (N, 5) distribution, walking the
+        actions in the same order as util.sample.
+        """
+        cdf = dist[:, SAMPLE_ORDER].cumsum(axis=1)
+        choice = self.random.random_sample(self.numGames)
+        picked = (choice[:, None] > cdf).sum(axis=1)
+        picked = numpy.minimum(picked, 4)
+        return numpy.array(SAMPLE_ORDER)[picked]
+
+    def randomPacmanActions(self):
+        "A vectorized random Pacman that never stops unless it has to."
+        legal = self.getLegalPacmanMask()
+        moving = legal.copy()
+        moving[:, STOP] = False
+        stuck = ~moving.any(axis=1)
+        moving[stuck] = legal[stuck]
+        count = moving.sum(axis=1).astype(float)
+        count[count == 0] = 1.0
+        return self.sampleActions(moving / count[:, None])
+
+    ##################
+    # Game dynamics  #
+    ##################
+
+    def step(self, pacmanActions):
+        """
+        Plays one round in every running game.  pacmanActions is a length N
+        sequence of action indices (or Directions strings).  Returns the
+        change in score of each game over the round.
+        """
+        actions = numpy.array([ACTION_INDEX.get(a, a) for a in pacmanActions], dtype=int)
+        before = self.scores.copy()
+        self._movePacman(actions)
+        for ghost in range(self.numGhosts):
+            active = ~self.isOver()
+            if not active.any(): break
+            legal = self.getLegalGhostMask(ghost)
+            if self.streams != None:
+                ghostActions = self.sampleGhostActions(ghost, legal, active)
+            else:
+                ghostActions = self.sampleActions(self.getGhostDistribution(ghost, legal))
+            self._moveGhost(ghost, ghostActions, active)
+        return self.scores - before
+
+    def _movePacman(self, actions):
+        active = ~self.isOver()
+        games = numpy.nonzero(active)[0]
+        legal = self.openDirections[self.pacmanX[games], self.pacmanY[games], actions[games]]
+        if not legal.all():
+            bad = games[~legal][0]
+            raise Exception("Illegal action " + ACTIONS[actions[bad]] + " in game %d" % bad)
+
+        scoreChange = numpy.zeros(self.numGames, dtype=int)
+        self.pacmanX[games] += numpy.array(DX)[actions[games]]
+        self.pacmanY[games] += numpy.array(DY)[actions[games]]
+        moved = games[actions[games] != STOP]
+        self.pacmanDirection[moved] = actions[moved]
+        x, y = self.pacmanX[games], self.pacmanY[games]
+
+        # Eat food
+        eats = self.foodGrids[games, x, y]
+        eaters = games[eats]
+        self.foodGrids[eaters, x[eats], y[eats]] = False
+        self.numFood[eaters] -= 1
+        scoreChange[eaters] += 10
+        cleared = eaters[self.numFood[eaters] == 0]
+        scoreChange[cleared] += 500
+        self.win[cleared] = True
+
+        # Eat capsules
+        caps = self.capsuleGrids[games, x, y]
+        capsuleEaters = games[caps]
+        self.capsuleGrids[capsuleEaters, x[caps], y[caps]] = False
+        self.scaredTimers[capsuleEaters] = SCARED_TIME
+
+        scoreChange[games] -= TIME_PENALTY
+        self.numMoves[games] += 1
+        for ghost in range(self.numGhosts):
+            self._checkDeath(ghost, games, scoreChange)
+        self.scores += scoreChange
+
+    def _moveGhost(self, ghost, actions, active):
+        games = numpy.nonzero(active)[0]
+        actions = actions[games]
+        scared = self.scaredTimers[games, ghost] > 0
+        step = numpy.where(scared, 1, 2)
+        self.ghostX2[games, ghost] += step * numpy.array(DX)[actions]
+        self.ghostY2[games, ghost] += step * numpy.array(DY)[actions]
+        moved = actions != STOP
+        self.ghostDirection[games[moved], ghost] = actions[moved]
+
+        # Scared timers run out; snap to the nearest grid point on the last tick
+        timers = self.scaredTimers[games, ghost]
+        snap = games[timers == 1]
+        self.ghostX2[snap, ghost] = 2 * ((self.ghostX2[snap, ghost] + 1) // 2)
+        self.ghostY2[snap, ghost] = 2 * ((self.ghostY2[snap, ghost] + 1) // 2)
+        self.scaredTimers[games, ghost] = numpy.maximum(0, timers - 1)
+
+        scoreChange = numpy.zeros(self.numGames, dtype=int)
+        self._checkDeath(ghost, games, scoreChange)
+        self.scores += scoreChange
+
+    def _checkDeath(self, ghost, games, scoreChange):
+        "Vectorized GhostRules.checkDeath / collide for one ghost."
+        distance = (numpy.abs(self.ghostX2[games, ghost] - 2 * self.pacmanX[games]) +
+                    numpy.abs(self.ghostY2[games, ghost] - 2 * self.pacmanY[games]))
+        # COLLISION_TOLERANCE is 0.7, i.e. at most one half-cell step apart
+        touching = games[distance <= 1]
+        if len(touching) == 0: return
+        scared = self.scaredTimers[touching, ghost] > 0
+
+        eaten = touching[scared]
+        scoreChange[eaten] += 200
+        self.ghostX2[eaten, ghost] = self.ghostStartX2[ghost]
+        self.ghostY2[eaten, ghost] = self.ghostStartY2[ghost]
+        self.ghostDirection[eaten, ghost] = STOP
+        self.scaredTimers[eaten, ghost] = 0
+
+        killers = touching[~scared]
+        killers = killers[~self.win[killers]]
+        scoreChange[killers] -= 500
+        self.lose[killers] = True
+
+    def run(self, pacmanPolicy=None, maxMoves=10000):
+        """
+        Plays until every game is over (or maxMoves rounds have passed).
+        pacmanPolicy maps this BatchGames to an array of Pacman actions; the
+        default is randomPacmanActions.
+        """
+        if pacmanPolicy == None:
+            pacmanPolicy = lambda games: games.randomPacmanActions()
+        rounds = 0
+        while not self.allOver() and rounds < maxMoves:
+            self.step(pacmanPolicy(self))
+            rounds += 1
+        return self.scores.copy(), self.win.copy()
+
+def runBatchGames(layout, numGames, ghostType='RandomGhost', numGhosts=4, seed=None, maxMoves=10000, streamSeed=None):
+    streams = None
+    if streamSeed != None: streams = util.RandomStream(streamSeed)
+    games = BatchGames(layout, numGames, ghostType, numGhosts, seed, streams=streams)
+    scores, wins = games.run(maxMoves=maxMoves)
+    numWins = int(wins.sum())
+    print 'Average Score:', scores.mean()
+    print 'Win Rate:      %d/%d (%.2f)' % (numWins, numGames, numWins / float(numGames))
+    return games
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE:      python batchPacman.py <options>')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int',
+                      help='the number of GAMES to play [Default: %default]', default=1000)
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='the LAYOUT_FILE from which to load the map layout [Default: %default]')
+    parser.add_option('-g', '--ghosts', dest='ghost', default='RandomGhost',
+                      help='RandomGhost or DirectionalGhost [Default: %default]')
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts', default=4,
+                      help='The maximum number of ghosts to use [Default: %default]')
+    parser.add_option('-s', '--seed', type='int', dest='seed', default=None,
+                      help='Seed for the ghosts and the random Pacman')
+    parser.add_option('--streamSeed', type='int', dest='streamSeed', default=None,
+                      help='Move the ghosts as pacman.py --seed STREAMSEED would (slower)')
+    parser.add_option('-m', '--maxMoves', type='int', dest='maxMoves', default=10000,
+                      help='Rounds after which unfinished games are stopped [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    theLayout = layout.getLayout(options.layout)
+    if theLayout == None: raise Exception("The layout " + options.layout + " cannot be found")
+    return dict(layout=theLayout, numGames=options.numGames, ghostType=options.ghost,
+                numGhosts=options.numGhosts, seed=options.seed, maxMoves=options.maxMoves,
+                streamSeed=options.streamSeed)
+
+if __name__ == '__main__':
+    args = readCommand(sys.argv[1:])
+    start = time.time()
+    runBatchGames(**args)
+    print 'Simulated %d games in %.2f seconds' % (args['numGames'], time.time() - start)
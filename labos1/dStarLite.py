@@ -0,0 +1,179 @@
+# dStarLite.py
+# ------------
+"""
+Incremental replanning with D* Lite (Koenig and Likhachev, 2002).
+
+D* Lite searches backwards from the goal, so the distances it computes
+(g values) stay valid when the agent moves.  When the cost of entering some
+cells changes (a ghost comes near, a wall appears or disappears) only the
+cells whose distance to the goal actually changes are expanded again,
+instead of searching the whole maze from scratch.
+
+>>> planner = DStarLite(walls, start=(35, 35), goal=(1, 1))
+>>> planner.computeShortestPath()
+>>> action = planner.getNextAction()
+>>> planner.moveTo(newPosition)
+>>> planner.setCosts({(20, 7): INFINITY})         # block a cell
+>>> planner.computeShortestPath()                  # repairs the old search
+
+Moving from a cell into a neighbor costs the neighbor's cost: 1 by default,
+INFINITY for walls.  Costs are never below 1, so the Manhattan distance is
+a consistent heuristic.
+"""
+
+import heapq
+from game import Directions, Actions
+
+INFINITY = float('inf')
+
+_MOVES = [(action, Actions._directions[action]) for action in
+          [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]]
+
+class DStarLite:
+    """
+    A D* Lite planner on a walls grid.  The grid is only read; call
+    setWalls when walls change so that the planner can repair its search.
+    """
+    def __init__(self, walls, start, goal):
+        self.walls = walls
+        self.width, self.height = walls.width, walls.height
+        self.start = self.last = start
+        self.goal = goal
+        self.costs = {}
+        self.g = {}
+        self.rhs = {goal: 0}
+        self.km = 0
+        # Lazy deletion: a queue entry is current only if it matches queued
+        self.queue = []
+        self.queued = {}
+        self._push(goal, self.calculateKey(goal))
+        self.expanded = 0
+
+    def heuristic(self, position1, position2):
+        return abs(position1[0] - position2[0]) + abs(position1[1] - position2[1])
+
+    def getCost(self, position):
+        "The cost of moving into a cell."
+        x, y = position
+        if self.walls[x][y]: return INFINITY
+        return self.costs.get(position, 1)
+
+    def getNeighbors(self, position):
+        "(neighbor, action) pairs of the cells next to position, walls included."
+        x, y = position
+        neighbors = []
+        for action, (dx, dy) in _MOVES:
+            if 0 <= x + dx < self.width and 0 <= y + dy < self.height:
+                neighbors.append(((x + dx, y + dy), action))
+        return neighbors
+
+    def calculateKey(self, position):
+        best = min(self.g.get(position, INFINITY), self.rhs.get(position, INFINITY))
+        return (best + self.heuristic(self.start, position) + self.km, best)
+
+    def _push(self, position, key):
+        self.queued[position] = key
+        heapq.heappush(self.queue, (key, position))
+
+    def _topKey(self):
+        "The smallest key in the queue, dropping stale entries on the way."
+        while self.queue:
+            key, position = self.queue[0]
+            if self.queued.get(position) == key: return key
+            heapq.heappop(self.queue)
+        return (INFINITY, INFINITY)
+
+    def updateVertex(self, position):
+        if position != self.goal:
+            if self.walls[position[0]][position[1]]:
+                self.rhs[position] = INFINITY
+            else:
+                self.rhs[position] = min([self.getCost(neighbor) + self.g.get(neighbor, INFINITY)
+                                          for neighbor, action in self.getNeighbors(position)] + [INFINITY])
+        self.queued.pop(position, None)
+        if self.g.get(position, INFINITY) != self.rhs.get(position, INFINITY):
+            self._push(position, self.calculateKey(position))
+
+    def computeShortestPath(self):
+        """
+        Expands inconsistent cells until the start's distance to the goal is
+        known.  self.expanded counts the expansions over the planner's life.
+        """
+        start = self.start
+        while self._topKey() < self.calculateKey(start) or \
+              self.rhs.get(start, INFINITY) != self.g.get(start, INFINITY):
+            oldKey, position = heapq.heappop(self.queue)
+            del self.queued[position]
+            self.expanded += 1
+            newKey = self.calculateKey(position)
+            if oldKey < newKey:
+                self._push(position, newKey)
+            elif self.g.get(position, INFINITY) > self.rhs[position]:
+                self.g[position] = self.rhs[position]
+                for neighbor, action in self.getNeighbors(position):
+                    self.updateVertex(neighbor)
+            else:
+                self.g[position] = INFINITY
+                self.updateVertex(position)
+                for neighbor, action in self.getNeighbors(position):
+                    self.updateVertex(neighbor)
+
+    def getDistance(self):
+        "The cost of the best path from the start to the goal (INFINITY if there is none)."
+        return self.g.get(self.start, INFINITY)
+
+    def getNextAction(self, position=None):
+        """
+        The first action of the best path from position (the start by
+        default), or None if there is none.
+        """
+        if position == None: position = self.start
+        if position == self.goal or self.g.get(position, INFINITY) == INFINITY: return None
+        best, bestAction = INFINITY, None
+        for neighbor, action in self.getNeighbors(position):
+            cost = self.getCost(neighbor) + self.g.get(neighbor, INFINITY)
+            if cost < best: best, bestAction = cost, action
+        return bestAction
+
+    def getPath(self):
+        "The actions of the best path from the start, following the g values."
+        actions, position = [], self.start
+        while position != self.goal:
+            action = self.getNextAction(position)
+            if action == None: return None
+            actions.append(action)
+            dx, dy = Actions._directions[action]
+            position = (position[0] + dx, position[1] + dy)
+        return actions
+
+    def moveTo(self, position):
+        "Moves the start of the search to where the agent now is."
+        if position == self.start: return
+        self.km += self.heuristic(self.last, position)
+        self.last = self.start = position
+
+    def setCosts(self, changes):
+        """
+        Changes the cost of moving into cells; changes maps cells to their new
+        cost (None for the default of 1).
+        """
+        changed = []
+        for position, cost in changes.items():
+            if cost == None or cost == 1: self.costs.pop(position, None)
+            else: self.costs[position] = cost
+            changed.append(position)
+        self._costsChanged(changed)
+
+    def setWalls(self, cells):
+        "Tells the planner that the walls grid changed at the given cells."
+        self._costsChanged(cells)
+
+    def _costsChanged(self, cells):
+        # Edges into a cell start at its neighbors, so those are the cells to update
+        affected = set()
+        for position in cells:
+            affected.add(position)
+            for neighbor, action in self.getNeighbors(position):
+                affected.add(neighbor)
+        for position in affected:
+            self.updateVertex(position)
@@ -21,7 +21,7 @@
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
 from util import *
-import time, os
+import time, os, random, string
 import traceback
 import sys
 
@@ -35,10 +35,20 @@ class Agent:
     following methods which will be called if they exist:
 
     def registerInitialState(self, state): # inspects the starting state
+
+    Agents that make random choices should draw them from self.rng.  It is
+    the global random module unless the Game hands the agent its own stream
+    through seedRandom.
     """
+    rng = random
+
     def __init__(self, index=0):
         self.index = index
 
+    def seedRandom(self, rng):
+        "Gives the agent its own random stream (a util.RandomStream) for the game."
+        self.rng = rng
+
     def getAction(self, state):
         """
         The Agent will receive a GameState (from either {pacman, capture, sonar}.py) and
@@ -161,9 +171,21 @@ class AgentState:
 
 class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.  Data is accessed
-    via grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
-    y vertical and the origin (0,0) in the bottom left corner.
+    A 2-dimensional array of booleans backed by one bytearray per column.  Data
+    is accessed via grid[x][y] where (x,y) are positions on a Pacman map with x
+    horizontal, y vertical and the origin (0,0) in the bottom left corner.
+    Cells read back as 1 or 0.
+
+    Since a column is a flat byte string, counting, listing, comparing, hashing
+    and packing the grid are done a column at a time by bytearray methods
+    instead of cell by cell.
+
+    Tables derived from the cells, like the Adjacency of Actions.getAdjacency
+    (with its JunctionGraph) and the hierarchies of hierarchicalPathfinding,
+    are cached on the grid itself.  Writing grid[x][y] does not drop them, so
+    whoever changes the cells of a grid must call wallsChanged or
+    invalidateCaches afterwards (copies start without caches; a shallowCopy
+    shares the cells, so both grids have to be told).
 
     The __str__ method constructs an output that is oriented like a pacman board.
     """
@@ -173,7 +195,7 @@ class Grid:
 
         self.width = width
         self.height = height
-        self.data = [[initialValue for y in range(height)] for x in range(width)]
+        self.data = [bytearray(_CELL_BYTES[initialValue] * height) for x in range(width)]
         if bitRepresentation:
             self._unpackBits(bitRepresentation)
 
@@ -181,31 +203,28 @@ class Grid:
         return self.data[i]
 
     def __setitem__(self, key, item):
+        if type(item) != bytearray: item = bytearray(item)
         self.data[key] = item
 
     def __str__(self):
-        out = [[str(self.data[x][y])[0] for x in range(self.width)] for y in range(self.height)]
+        out = [''.join([self.data[x][y] and 'T' or 'F' for x in range(self.width)]) for y in range(self.height)]
         out.reverse()
-        return '\n'.join([''.join(x) for x in out])
+        return '\n'.join(out)
 
     def __eq__(self, other):
         if other == None: return False
         return self.data == other.data
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        return hash(self._cells())
+
+    def _cells(self):
+        "All cells as one byte string, in the order x * height + y."
+        return ''.join([str(column) for column in self.data])
 
     def copy(self):
         g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
+        g.data = [bytearray(x) for x in self.data]
         return g
 
     def deepCopy(self):
@@ -216,14 +235,34 @@ class Grid:
         g.data = self.data
         return g
 
+    def invalidateCaches(self):
+        "Drops the tables cached on the grid, which no longer match changed cells."
+        self.adjacency = None
+        self.hierarchies = None
+
+    def wallsChanged(self, cells):
+        """
+        Brings the tables cached on the grid up to date after the given cells
+        changed: the Adjacency is dropped and every cached ClusterHierarchy
+        rebuilds the clusters around the cells.
+        """
+        self.adjacency = None
+        for hierarchy in (getattr(self, 'hierarchies', None) or {}).values():
+            hierarchy.update(cells)
+
     def count(self, item =True ):
-        return sum([x.count(item) for x in self.data])
+        cell = _CELL_BYTES[bool(item)]
+        return sum([x.count(cell) for x in self.data])
 
     def asList(self, key = True):
+        cell = _CELL_BYTES[bool(key)]
         list = []
         for x in range(self.width):
-            for y in range(self.height):
-                if self[x][y] == key: list.append( (x,y) )
+            column = self.data[x]
+            y = column.find(cell)
+            while y != -1:
+                list.append( (x,y) )
+                y = column.find(cell, y + 1)
         return list
 
     def packBits(self):
@@ -232,17 +271,13 @@ class Grid:
 
         (width, height, bitPackedInts...)
         """
+        size = self.CELLS_PER_INT
+        cells = self._cells().translate(_CELLS_TO_DIGITS)
+        # The last int is padded with zeros (and is all padding when the cells
+        # fill the other ints exactly)
+        cells += '0' * (size - len(cells) % size)
         bits = [self.width, self.height]
-        currentInt = 0
-        for i in range(self.height * self.width):
-            bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
-                currentInt += 2 ** bit
-            if (i + 1) % self.CELLS_PER_INT == 0:
-                bits.append(currentInt)
-                currentInt = 0
-        bits.append(currentInt)
+        bits.extend([int(cells[i:i + size], 2) for i in range(0, len(cells), size)])
         return tuple(bits)
 
     def _cellIndexToPosition(self, index):
@@ -254,25 +289,17 @@ class Grid:
         """
         Fills in data from a bit-level representation
         """
-        cell = 0
         for packed in bits:
-            for bit in self._unpackInt(packed, self.CELLS_PER_INT):
-                if cell == self.width * self.height: break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
-                cell += 1
-
-    def _unpackInt(self, packed, size):
-        bools = []
-        if packed < 0: raise ValueError, "must be a positive integer"
-        for i in range(size):
-            n = 2 ** (self.CELLS_PER_INT - i - 1)
-            if packed >= n:
-                bools.append(True)
-                packed -= n
-            else:
-                bools.append(False)
-        return bools
+            if packed < 0: raise ValueError, "must be a positive integer"
+        digits = ''.join([bin(packed)[2:].zfill(self.CELLS_PER_INT) for packed in bits])
+        cells = digits[:self.width * self.height].translate(_DIGITS_TO_CELLS)
+        h = self.height
+        for x in range(len(cells) // h):
+            self.data[x] = bytearray(cells[x * h:(x + 1) * h])
+
+_CELL_BYTES = {False: '\x00', True: '\x01'}
+_CELLS_TO_DIGITS = string.maketrans('\x00\x01', '01')
+_DIGITS_TO_CELLS = string.maketrans('01', '\x00\x01')
 
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
@@ -330,7 +357,6 @@ class Actions:
     directionToVector = staticmethod(directionToVector)
 
     def getPossibleActions(config, walls):
-        possible = []
         x, y = config.pos
         x_int, y_int = int(x + 0.5), int(y + 0.5)
 
@@ -338,36 +364,141 @@ class Actions:
         if (abs(x - x_int) + abs(y - y_int)  > Actions.TOLERANCE):
             return [config.getDirection()]
 
-        for dir, vec in Actions._directionsAsList:
-            dx, dy = vec
-            next_y = y_int + dy
-            next_x = x_int + dx
-            if not walls[next_x][next_y]: possible.append(dir)
-
-        return possible
+        return list(Actions.getAdjacency(walls).actions[x_int][y_int])
 
     getPossibleActions = staticmethod(getPossibleActions)
 
     def getLegalNeighbors(position, walls):
         x,y = position
         x_int, y_int = int(x + 0.5), int(y + 0.5)
-        neighbors = []
-        for dir, vec in Actions._directionsAsList:
-            dx, dy = vec
-            next_x = x_int + dx
-            if next_x < 0 or next_x == walls.width: continue
-            next_y = y_int + dy
-            if next_y < 0 or next_y == walls.height: continue
-            if not walls[next_x][next_y]: neighbors.append((next_x, next_y))
-        return neighbors
+        return list(Actions.getAdjacency(walls).neighbors[x_int][y_int])
     getLegalNeighbors = staticmethod(getLegalNeighbors)
 
+    def getAdjacency(walls):
+        """
+        Returns the Adjacency of a walls grid, building it the first time it
+        is asked for.  The walls of a layout never change, so it is kept on
+        the grid itself until Grid.invalidateCaches drops it.
+        """
+        adjacency = getattr(walls, 'adjacency', None)
+        if adjacency == None:
+            adjacency = walls.adjacency = Adjacency(walls)
+        return adjacency
+    getAdjacency = staticmethod(getAdjacency)
+
     def getSuccessor(position, action):
         dx, dy = Actions.directionToVector(action)
         x, y = position
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+class Adjacency:
+    """
+    The moves possible from every cell of a walls grid, computed once so that
+    successor functions do not have to add direction vectors and test walls
+    on every call.  Cell (x, y) has index x * height + y.
+
+      moves[index]       (neighborIndex, action) pairs for North, South, East,
+                         West, in that order (the order successor functions use)
+      successors[pos]    the same moves as (neighborPosition, action) pairs,
+                         keyed by the position of every open cell
+      actions[x][y]      the actions of getPossibleActions, Stop included
+      neighbors[x][y]    the positions of getLegalNeighbors
+
+    Moves that leave the grid are never legal.
+    """
+    def __init__(self, walls):
+        self.width, self.height = width, height = walls.width, walls.height
+        self.positions = [(x, y) for x in range(width) for y in range(height)]
+        self.moves = []
+        self.successors = {}
+        self.actions = [[None] * height for x in range(width)]
+        self.neighbors = [[None] * height for x in range(width)]
+
+        def isOpen(x, y):
+            return 0 <= x < width and 0 <= y < height and not walls[x][y]
+
+        for x, y in self.positions:
+            moves = []
+            for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                dx, dy = Actions._directions[action]
+                if isOpen(x + dx, y + dy):
+                    moves.append(((x + dx) * height + y + dy, action))
+            self.moves.append(tuple(moves))
+            if not walls[x][y]:
+                self.successors[(x, y)] = tuple([(self.positions[i], action) for i, action in moves])
+
+            legal = [(dir, (x + dx, y + dy)) for dir, (dx, dy) in Actions._directionsAsList if isOpen(x + dx, y + dy)]
+            self.actions[x][y] = tuple([dir for dir, position in legal])
+            self.neighbors[x][y] = tuple([position for dir, position in legal])
+
+    def getIndex(self, position):
+        x, y = position
+        return x * self.height + y
+
+    def getJunctionGraph(self):
+        "The JunctionGraph of the grid, built the first time it is asked for."
+        if getattr(self, 'junctionGraph', None) == None:
+            self.junctionGraph = JunctionGraph(self)
+        return self.junctionGraph
+
+class JunctionGraph:
+    """
+    The open cells of a walls grid with every corridor contracted into a
+    single edge.  Junctions are the cells that do not have exactly two
+    neighbors (crossings and dead ends), plus one cell on each loop that has
+    none; every other cell lies on a corridor between two junctions.
+
+      corridors[junction]    (end, actions, cells) for every move out of the
+                             junction: the actions that follow the corridor,
+                             the cells they enter in order, and the junction
+                             at its end (the last cell)
+      corridorsThrough[cell] (junction, k) pairs of the corridors that pass
+                             through a cell between junctions
+
+    In mazes like bigMaze most cells are corridor cells, so a search over the
+    junctions expands a fraction of the nodes a search over cells does.
+    """
+    def __init__(self, adjacency):
+        self.successors = successors = adjacency.successors
+        self.junctions = set([pos for pos in successors if len(successors[pos]) != 2])
+        self.corridors = {}
+        self.corridorsThrough = {}
+
+        for junction in list(self.junctions):
+            self._addCorridors(junction)
+        # Cells left over lie on loops without junctions
+        for pos in successors:
+            if pos not in self.junctions and pos not in self.corridorsThrough:
+                self.junctions.add(pos)
+                self._addCorridors(pos)
+
+    def _addCorridors(self, junction):
+        corridors = []
+        for k, move in enumerate(self.successors[junction]):
+            end, actions, cells = self.walk(junction, move)
+            corridors.append((end, actions, cells))
+            for cell in cells[:-1]:
+                self.corridorsThrough.setdefault(cell, []).append((junction, k))
+        self.corridors[junction] = tuple(corridors)
+
+    def walk(self, position, move, stops=()):
+        """
+        Follows a corridor from position, starting with move (a (nextPosition,
+        action) pair), to the next junction or a position in stops.  Returns
+        the cell it ends at, the actions taken and the cells entered.
+        """
+        current, action = move
+        actions, cells = [action], [current]
+        previous = position
+        while current not in self.junctions and current not in stops:
+            for nextPosition, action in self.successors[current]:
+                if nextPosition != previous: break
+            previous, current = current, nextPosition
+            actions.append(action)
+            cells.append(current)
+        return current, tuple(actions), tuple(cells)
+
 class GameStateData:
     """
 
@@ -434,7 +565,7 @@ class GameStateData:
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
-        map = Grid(width, height)
+        map = [[' ' for y in range(height)] for x in range(width)]
         if type(self.food) == type((1,2)):
             self.food = reconstituteGrid(self.food)
         for x in range(width):
@@ -455,7 +586,9 @@ class GameStateData:
         for x, y in self.capsules:
             map[x][y] = 'o'
 
-        return str(map) + ("\nScore: %d\n" % self.score)
+        out = [''.join([map[x][y] for x in range(width)]) for y in range(height)]
+        out.reverse()
+        return '\n'.join(out) + ("\nScore: %d\n" % self.score)
 
     def _foodWallStr( self, hasFood, hasWall ):
         if hasFood:
@@ -515,8 +648,9 @@ class Game:
     The Game manages the control flow, soliciting actions from agents.
     """
 
-    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False ):
+    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False, rng=None ):
         self.agentCrashed = False
+        self.rng = rng
         self.agents = agents
         self.display = display
         self.rules = rules
@@ -564,49 +698,39 @@ class Game:
         sys.stderr = OLD_STDERR
 
 
+    def isHeadless( self ):
+        """
+        A game is headless when nothing is drawn (NullGraphics, as selected by
+        -q or for training games) and agent output is not being captured.
+        """
+        if self.muteAgents or 'checkNullDisplay' not in dir(self.display): return False
+        return self.display.checkNullDisplay()
+
+    def seedAgents(self):
+        """
+        Splits the game's random stream into one stream per agent, so each
+        agent's choices depend only on the game's seed and its own index.
+        """
+        for i in range(len(self.agents)):
+            agent = self.agents[i]
+            if agent and 'seedRandom' in dir(agent):
+                agent.seedRandom(self.rng.split(i))
+
     def run( self ):
         """
         Main control loop for game play.
         """
+        if self.rng != None:
+            self.seedAgents()
+        if self.isHeadless():
+            return self.runHeadless()
+
         self.display.initialize(self.state.data)
         self.numMoves = 0
 
         ###self.display.initialize(self.state.makeObservation(1).data)
         # inform learning agents of the game start
-        for i in range(len(self.agents)):
-            agent = self.agents[i]
-            if not agent:
-                self.mute(i)
-                # this is a null agent, meaning it failed to load
-                # the other team wins
-                print >>sys.stderr, "Agent %d failed to load" % i
-                self.unmute()
-                self._agentCrash(i, quiet=True)
-                return
-            if ("registerInitialState" in dir(agent)):
-                self.mute(i)
-                if self.catchExceptions:
-                    try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
-                        try:
-                            start_time = time.time()
-                            timed_func(self.state.deepCopy())
-                            time_taken = time.time() - start_time
-                            self.totalAgentTimes[i] += time_taken
-                        except TimeoutFunctionException:
-                            print >>sys.stderr, "Agent %d ran out of time on startup!" % i
-                            self.unmute()
-                            self.agentTimeout = True
-                            self._agentCrash(i, quiet=True)
-                            return
-                    except Exception,data:
-                        self._agentCrash(i, quiet=False)
-                        self.unmute()
-                        return
-                else:
-                    agent.registerInitialState(self.state.deepCopy())
-                ## TODO: could this exceed the total time
-                self.unmute()
+        if not self._registerAgents(useAlarm=True): return
 
         agentIndex = self.startingIndex
         numAgents = len( self.agents )
@@ -659,22 +783,7 @@ class Game:
 
                     move_time += time.time() - start_time
 
-                    if move_time > self.rules.getMoveWarningTime(agentIndex):
-                        self.totalAgentTimeWarnings[agentIndex] += 1
-                        print >>sys.stderr, "Agent %d took too long to make a move! This is warning %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex])
-                        if self.totalAgentTimeWarnings[agentIndex] > self.rules.getMaxTimeWarnings(agentIndex):
-                            print >>sys.stderr, "Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex])
-                            self.agentTimeout = True
-                            self._agentCrash(agentIndex, quiet=True)
-                            self.unmute()
-                            return
-
-                    self.totalAgentTimes[agentIndex] += move_time
-                    #print "Agent: %d, time: %f, total: %f" % (agentIndex, move_time, self.totalAgentTimes[agentIndex])
-                    if self.totalAgentTimes[agentIndex] > self.rules.getMaxTotalTime(agentIndex):
-                        print >>sys.stderr, "Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalAgentTimes[agentIndex])
-                        self.agentTimeout = True
-                        self._agentCrash(agentIndex, quiet=True)
+                    if self._chargeMoveTime(agentIndex, move_time):
                         self.unmute()
                         return
                     self.unmute()
@@ -687,17 +796,7 @@ class Game:
             self.unmute()
 
             # Execute the action
-            self.moveHistory.append( (agentIndex, action) )
-            if self.catchExceptions:
-                try:
-                    self.state = self.state.generateSuccessor( agentIndex, action )
-                except Exception,data:
-                    self.mute(agentIndex)
-                    self._agentCrash(agentIndex)
-                    self.unmute()
-                    return
-            else:
-                self.state = self.state.generateSuccessor( agentIndex, action )
+            if not self._applyMove(agentIndex, action): return
 
             # Change the display
             self.display.update( self.state.data )
@@ -714,16 +813,183 @@ class Game:
             if _BOINC_ENABLED:
                 boinc.set_fraction_done(self.getProgress())
 
-        # inform a learning agent of the game result
-        for agentIndex, agent in enumerate(self.agents):
-            if "final" in dir( agent ) :
+        self._endGame()
+
+    def runHeadless( self ):
+        """
+        A low-overhead version of run for games that are not displayed.
+
+        Agent capabilities are looked up once instead of on every move, agents
+        that do not define observationFunction see the current state directly
+        (states are never modified in place, generateSuccessor copies them), and
+        stdout is left alone.  With catchExceptions, time is accounted by
+        reading the clock around each call rather than by arming a SIGALRM
+        timer per move, so a budget overrun is detected when the call returns.
+        """
+        self.display.initialize(self.state.data)
+        self.numMoves = 0
+        if not self._registerAgents(useAlarm=False): return
+
+        numAgents = len( self.agents )
+        rules = self.rules
+        catchExceptions = self.catchExceptions
+        clock = time.time
+        observers = [getattr(agent, 'observationFunction', None) for agent in self.agents]
+        getActions = [agent.getAction for agent in self.agents]
+        agentIndex = self.startingIndex
+
+        while not self.gameOver:
+            observe = observers[agentIndex]
+            getAction = getActions[agentIndex]
+
+            if not catchExceptions:
+                if observe == None:
+                    action = getAction(self.state)
+                else:
+                    action = getAction(observe(self.state.deepCopy()))
+            else:
                 try:
-                    self.mute(agentIndex)
-                    agent.final( self.state )
-                    self.unmute()
+                    start_time = clock()
+                    if observe == None:
+                        observation = self.state
+                    else:
+                        observation = observe(self.state.deepCopy())
+                    action = getAction(observation)
+                    move_time = clock() - start_time
                 except Exception,data:
-                    if not self.catchExceptions: raise
                     self._agentCrash(agentIndex)
-                    self.unmute()
                     return
+                if self._overBudget(agentIndex, move_time): return
+
+            if not self._applyMove(agentIndex, action): return
+
+            # Allow for game specific conditions (winning, losing, etc.)
+            rules.process(self.state, self)
+            # Next agent
+            agentIndex = ( agentIndex + 1 ) % numAgents
+
+            if _BOINC_ENABLED:
+                boinc.set_fraction_done(self.getProgress())
+
+        self._endGame()
+
+    def _registerAgents( self, useAlarm ):
+        """
+        Tells the agents that the game starts (registerInitialState).  With
+        catchExceptions an agent that crashes or takes longer than the
+        startup time loses; useAlarm stops it with a SIGALRM timer, otherwise
+        the overrun is noticed when it returns.  Returns False if the game
+        ended.
+        """
+        for i in range(len(self.agents)):
+            agent = self.agents[i]
+            if not agent:
+                self.mute(i)
+                # this is a null agent, meaning it failed to load
+                # the other team wins
+                print >>sys.stderr, "Agent %d failed to load" % i
+                self.unmute()
+                self._agentCrash(i, quiet=True)
+                return False
+            registerInitialState = getattr(agent, 'registerInitialState', None)
+            if registerInitialState == None: continue
+            self.mute(i)
+            if self.catchExceptions:
+                try:
+                    timeout = int(self.rules.getMaxStartupTime(i))
+                    try:
+                        start_time = time.time()
+                        if useAlarm:
+                            TimeoutFunction(registerInitialState, timeout)(self.state.deepCopy())
+                        else:
+                            registerInitialState(self.state.deepCopy())
+                        time_taken = time.time() - start_time
+                        self.totalAgentTimes[i] += time_taken
+                        if not useAlarm and time_taken > timeout:
+                            raise TimeoutFunctionException()
+                    except TimeoutFunctionException:
+                        print >>sys.stderr, "Agent %d ran out of time on startup!" % i
+                        self.unmute()
+                        self.agentTimeout = True
+                        self._agentCrash(i, quiet=True)
+                        return False
+                except Exception,data:
+                    self._agentCrash(i, quiet=False)
+                    self.unmute()
+                    return False
+            else:
+                registerInitialState(self.state.deepCopy())
+            ## TODO: could this exceed the total time
+            self.unmute()
+        return True
+
+    def _applyMove( self, agentIndex, action ):
+        """
+        Records an agent's action and moves the game on to the next state.
+        With catchExceptions an illegal action loses the game.  Returns False
+        if the game ended.
+        """
+        self.moveHistory.append( (agentIndex, action) )
+        if self.catchExceptions:
+            try:
+                self.state = self.state.generateSuccessor( agentIndex, action )
+            except Exception,data:
+                self.mute(agentIndex)
+                self._agentCrash(agentIndex)
+                self.unmute()
+                return False
+        else:
+            self.state = self.state.generateSuccessor( agentIndex, action )
+        return True
+
+    def _endGame( self ):
+        "Informs learning agents of the game result and closes the display."
+        for agentIndex, agent in enumerate(self.agents):
+            final = getattr(agent, 'final', None)
+            if final == None: continue
+            try:
+                self.mute(agentIndex)
+                final( self.state )
+                self.unmute()
+            except Exception,data:
+                if not self.catchExceptions: raise
+                self._agentCrash(agentIndex)
+                self.unmute()
+                return
         self.display.finish()
+
+    def _chargeMoveTime( self, agentIndex, move_time ):
+        """
+        Charges move_time to an agent, warning it if the move was slow, and
+        crashes it if it went over the rules' limits.  Returns True if it did.
+        """
+        if move_time > self.rules.getMoveWarningTime(agentIndex):
+            self.totalAgentTimeWarnings[agentIndex] += 1
+            print >>sys.stderr, "Agent %d took too long to make a move! This is warning %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex])
+            if self.totalAgentTimeWarnings[agentIndex] > self.rules.getMaxTimeWarnings(agentIndex):
+                print >>sys.stderr, "Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, self.totalAgentTimeWarnings[agentIndex])
+                self.agentTimeout = True
+                self._agentCrash(agentIndex, quiet=True)
+                return True
+
+        self.totalAgentTimes[agentIndex] += move_time
+        #print "Agent: %d, time: %f, total: %f" % (agentIndex, move_time, self.totalAgentTimes[agentIndex])
+        if self.totalAgentTimes[agentIndex] > self.rules.getMaxTotalTime(agentIndex):
+            print >>sys.stderr, "Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalAgentTimes[agentIndex])
+            self.agentTimeout = True
+            self._agentCrash(agentIndex, quiet=True)
+            return True
+        return False
+
+    def _overBudget( self, agentIndex, move_time ):
+        """
+        runHeadless's stand-in for the SIGALRM timer of run: crashes an agent
+        whose move took longer than the move timeout, and otherwise charges
+        the time like run does.  Returns True if the agent crashed.
+        """
+        if move_time > int(self.rules.getMoveTimeout(agentIndex)):
+            print >>sys.stderr, "Agent %d timed out on a single move!" % agentIndex
+            self.agentTimeout = True
+            self._agentCrash(agentIndex, quiet=True)
+            return True
+        return self._chargeMoveTime(agentIndex, move_time)
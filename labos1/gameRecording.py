@@ -0,0 +1,333 @@
+# gameRecording.py
+# ----------------
+"""
+A compact binary format for recorded games, and a streaming reader for it.
+
+The old format (a cPickle of the whole Layout plus a list of
+(agentIndex, action) tuples) has to be loaded in full to do anything with
+it.  A recording in this format is laid out as:
+
+  header       magic, layout name and SHA-1 hash, number of agents, starting
+               agent, number of moves, final score and outcome
+  stop list    delta-coded varints of the move numbers where the action was
+               Stop
+  checkpoints  an index of (move number, offset) pairs
+  actions      two bits per move (North, South, East, West); the agent of
+               each move follows from the round-robin order of Game.run
+  snapshots    the full game state after every checkpointed move
+
+Everything before the action stream is small, so a reader can summarize a
+recording, or jump to any move, without reading the rest of the file.
+"""
+
+import os
+from game import Directions, Configuration, Grid
+
+MAGIC = 'PMRC'
+VERSION = 1
+
+ACTION_CODES = {Directions.NORTH: 0, Directions.SOUTH: 1, Directions.EAST: 2, Directions.WEST: 3}
+CODE_ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+DIRECTION_CODES = {Directions.NORTH: 0, Directions.SOUTH: 1, Directions.EAST: 2, Directions.WEST: 3, Directions.STOP: 4}
+CODE_DIRECTIONS = CODE_ACTIONS + [Directions.STOP]
+
+OUTCOME_NONE, OUTCOME_WIN, OUTCOME_LOSE = 0, 1, 2
+
+def isRecording(path):
+    "Checks whether a file is a recording in this format (not a pickle)."
+    f = open(path, 'rb')
+    try: return f.read(len(MAGIC)) == MAGIC
+    finally: f.close()
+
+######################
+# Low level encoding #
+######################
+
+def encodeVarint(n, out):
+    "Appends a non-negative integer to the bytearray out, 7 bits per byte."
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def encodeSigned(n, out):
+    "Zigzag encoding, so small negative numbers stay small."
+    encodeVarint((n << 1) if n >= 0 else ((-n << 1) - 1), out)
+
+def readVarint(f):
+    result, shift = 0, 0
+    while True:
+        byte = f.read(1)
+        if byte == '': raise EOFError('Truncated recording')
+        byte = ord(byte)
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80: return result
+        shift += 7
+
+def readSigned(f):
+    n = readVarint(f)
+    if n & 1: return -((n + 1) >> 1)
+    return n >> 1
+
+def encodeBytes(data, out):
+    encodeVarint(len(data), out)
+    out.extend(data)
+
+def readBytes(f):
+    return f.read(readVarint(f))
+
+##############
+# Snapshots  #
+##############
+
+def encodeSnapshot(state, out):
+    """
+    Appends a GameState's dynamic parts: agent configurations and scared
+    timers, score, food and capsules.  Positions are stored in half cells
+    since scared ghosts move at half speed.
+    """
+    data = state.data
+    encodeSigned(int(data.score), out)
+    encodeVarint(len(data.agentStates), out)
+    for agentState in data.agentStates:
+        x, y = agentState.configuration.pos
+        encodeSigned(int(round(2 * x)), out)
+        encodeSigned(int(round(2 * y)), out)
+        out.append(DIRECTION_CODES[agentState.configuration.direction])
+        encodeVarint(agentState.scaredTimer, out)
+    encodeVarint(len(data.capsules), out)
+    for x, y in data.capsules:
+        encodeVarint(x, out)
+        encodeVarint(y, out)
+    food = data.food
+    bits = bytearray((food.width * food.height + 7) // 8)
+    for i, (x, y) in enumerate((x, y) for x in range(food.width) for y in range(food.height)):
+        if food[x][y]: bits[i >> 3] |= 1 << (i & 7)
+    encodeBytes(bits, out)
+
+def decodeSnapshot(f, state):
+    "Overwrites the dynamic parts of a freshly initialized GameState."
+    data = state.data
+    data.score = readSigned(f)
+    numAgents = readVarint(f)
+    for i in range(numAgents):
+        x2, y2 = readSigned(f), readSigned(f)
+        direction = CODE_DIRECTIONS[ord(f.read(1))]
+        agentState = data.agentStates[i]
+        agentState.configuration = Configuration((x2 / 2.0 if x2 & 1 else x2 / 2, y2 / 2.0 if y2 & 1 else y2 / 2), direction)
+        agentState.scaredTimer = readVarint(f)
+    data.capsules = [(readVarint(f), readVarint(f)) for i in range(readVarint(f))]
+    bits = bytearray(readBytes(f))
+    food = Grid(data.food.width, data.food.height)
+    for i, (x, y) in enumerate((x, y) for x in range(food.width) for y in range(food.height)):
+        if bits[i >> 3] & (1 << (i & 7)): food[x][y] = True
+    data.food = food
+    return state
+
+###########
+# Writing #
+###########
+
+def initialState(layout, numAgents):
+    "The starting GameState of a game with numAgents agents on layout."
+    from pacman import GameState
+    state = GameState()
+    state.initialize(layout, numAgents - 1)
+    return state
+
+def writeRecording(path, layout, moveHistory, finalState, checkpointInterval=0, startingIndex=0):
+    """
+    Writes a finished game to path.  If checkpointInterval is positive, the
+    game is replayed while writing and a full snapshot is stored every
+    checkpointInterval moves, so readers can seek without replaying from the
+    start.
+    """
+    numAgents = finalState.getNumAgents()
+    if checkpointInterval > 0:
+        state = initialState(layout, numAgents)
+
+    stops, codes, snapshots = [], bytearray((len(moveHistory) + 3) // 4), []
+    for move, (agentIndex, action) in enumerate(moveHistory):
+        if agentIndex != (startingIndex + move) % numAgents:
+            raise Exception('Move %d is not in round-robin order' % move)
+        if action == Directions.STOP:
+            stops.append(move)
+        else:
+            codes[move >> 2] |= ACTION_CODES[action] << (2 * (move & 3))
+        if checkpointInterval > 0:
+            state = state.generateSuccessor(agentIndex, action)
+            if (move + 1) % checkpointInterval == 0 and move + 1 < len(moveHistory):
+                snapshot = bytearray()
+                encodeSnapshot(state, snapshot)
+                snapshots.append((move + 1, snapshot))
+
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    encodeBytes(getattr(layout, 'name', '') or '', out)
+    out.extend(layout.getHash())
+    encodeVarint(numAgents, out)
+    encodeVarint(startingIndex, out)
+    encodeVarint(len(moveHistory), out)
+    encodeSigned(int(finalState.data.score), out)
+    out.append(OUTCOME_WIN if finalState.isWin() else OUTCOME_LOSE if finalState.isLose() else OUTCOME_NONE)
+    if not getattr(layout, 'name', None):
+        # Layouts that cannot be found by name travel with the recording
+        encodeBytes('\n'.join(layout.layoutText), out)
+
+    encodeVarint(len(stops), out)
+    previous = 0
+    for move in stops:
+        encodeVarint(move - previous, out)
+        previous = move
+
+    encodeVarint(len(snapshots), out)
+    offset = 0
+    for move, snapshot in snapshots:
+        encodeVarint(move, out)
+        encodeVarint(offset, out)
+        offset += len(snapshot)
+
+    out.extend(codes)
+    for move, snapshot in snapshots:
+        out.extend(snapshot)
+
+    f = open(path, 'wb')
+    try: f.write(out)
+    finally: f.close()
+
+###########
+# Reading #
+###########
+
+class RecordingReader:
+    """
+    Reads a recording lazily.  Opening one only reads the header; actions
+    and snapshots are read on demand with seeks.
+
+    >>> reader = RecordingReader('recorded-game-1.rec')
+    >>> reader.numMoves, reader.score, reader.isWin()
+    >>> state = reader.getStateAt(500)     # game state after 500 moves
+    >>> reader.close()
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = f = open(path, 'rb')
+        if f.read(len(MAGIC)) != MAGIC:
+            f.close()
+            raise Exception(path + ' is not a recorded game')
+        version = ord(f.read(1))
+        if version != VERSION:
+            f.close()
+            raise Exception('Unsupported recording version %d' % version)
+        self.layoutName = readBytes(f)
+        self.layoutHash = f.read(20)
+        self.numAgents = readVarint(f)
+        self.startingIndex = readVarint(f)
+        self.numMoves = readVarint(f)
+        self.score = readSigned(f)
+        self.outcome = ord(f.read(1))
+        self.layoutText = None
+        if not self.layoutName:
+            self.layoutText = readBytes(f).split('\n')
+        self._layout = None
+        self._stops = None
+        self._checkpoints = None
+        self._headerEnd = f.tell()
+
+    def close(self):
+        self.file.close()
+
+    def isWin(self):
+        return self.outcome == OUTCOME_WIN
+
+    def isLose(self):
+        return self.outcome == OUTCOME_LOSE
+
+    def getLayout(self):
+        """
+        Loads the recorded layout by name (or from the embedded text) and
+        checks it against the stored hash.
+        """
+        if self._layout == None:
+            import layout
+            if self.layoutText != None:
+                theLayout = layout.Layout(self.layoutText)
+            else:
+                theLayout = layout.getLayout(self.layoutName)
+                if theLayout == None:
+                    raise Exception('The layout ' + self.layoutName + ' cannot be found')
+            if theLayout.getHash() != self.layoutHash:
+                raise Exception('The layout ' + self.layoutName + ' has changed since the game was recorded')
+            self._layout = theLayout
+        return self._layout
+
+    def _readIndex(self):
+        "Reads the stop list and checkpoint index that follow the header."
+        if self._stops != None: return
+        f = self.file
+        f.seek(self._headerEnd)
+        self._stops, move = set(), 0
+        for i in range(readVarint(f)):
+            move += readVarint(f)
+            self._stops.add(move)
+        self._checkpoints = []
+        for i in range(readVarint(f)):
+            self._checkpoints.append((readVarint(f), readVarint(f)))
+        self._actionsStart = f.tell()
+        self._snapshotsStart = self._actionsStart + (self.numMoves + 3) // 4
+
+    def getAgentIndex(self, move):
+        return (self.startingIndex + move) % self.numAgents
+
+    def getActions(self, start=0, stop=None):
+        """
+        Yields the (agentIndex, action) pairs of moves start..stop-1, reading
+        only the bytes that hold them.
+        """
+        self._readIndex()
+        if stop == None or stop > self.numMoves: stop = self.numMoves
+        if start >= stop: return
+        self.file.seek(self._actionsStart + start // 4)
+        codes = bytearray(self.file.read((stop + 3) // 4 - start // 4))
+        base = start - start % 4
+        for move in range(start, stop):
+            if move in self._stops:
+                action = Directions.STOP
+            else:
+                i = move - base
+                action = CODE_ACTIONS[(codes[i >> 2] >> (2 * (i & 3))) & 3]
+            yield self.getAgentIndex(move), action
+
+    def getInitialState(self):
+        return initialState(self.getLayout(), self.numAgents)
+
+    def getStateAt(self, move):
+        """
+        Returns the game state after the first 'move' moves, starting from
+        the closest snapshot at or before it.
+        """
+        self._readIndex()
+        state, start = self.getInitialState(), 0
+        best = None
+        for checkpoint, offset in self._checkpoints:
+            if checkpoint <= move: best = (checkpoint, offset)
+        if best != None:
+            start, offset = best
+            self.file.seek(self._snapshotsStart + offset)
+            decodeSnapshot(self.file, state)
+        for agentIndex, action in self.getActions(start, move):
+            state = state.generateSuccessor(agentIndex, action)
+        return state
+
+def scanRecordings(directory):
+    """
+    Yields a header-only RecordingReader for every recording in a directory,
+    closing each one before moving on to the next.
+    """
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path) or not isRecording(path): continue
+        reader = RecordingReader(path)
+        try: yield reader
+        finally: reader.close()
@@ -0,0 +1,314 @@
+# hierarchicalPathfinding.py
+# --------------------------
+"""
+Hierarchical path-finding (HPA*) for large mazes.
+
+The walls grid is cut into square clusters.  Wherever two neighboring
+clusters share a run of open cells along their border (an entrance), a pair
+of transition nodes is placed across it: one in the middle of short
+entrances, one at each end of long ones.  Within every cluster the BFS
+distance between each pair of its transition nodes is computed once.  These
+nodes and distances form a small abstract graph:
+
+  edges[node]              {neighborNode: cost} for the node across the
+                           entrance (cost 1) and the nodes of the same
+                           cluster it can reach without leaving the cluster
+  clusterNodes[cluster]    the transition nodes inside a cluster
+  borderTransitions[border] the (node, node) pairs across a border
+
+A query links the start and the goal to the nodes of their clusters, plans
+with A* over the abstract graph and then refines each abstract edge into
+single steps by a search confined to one cluster.  Paths are within a few
+percent of optimal, and a query expands a fraction of the nodes a search
+over cells does.  All steps cost 1.
+
+When walls change, update() rebuilds only the entrances and distances of
+the clusters around the changed cells.  setWalls changes them on a copy of
+the grid, so the layout itself is left alone:
+
+>>> hierarchy = getHierarchy(layout.walls)
+>>> hierarchy.findPath((1, 1), (35, 35))
+>>> hierarchy.setWalls([((10, 12), True)])
+>>> hierarchy.walls[10][12], layout.walls[10][12]
+(1, 0)
+"""
+
+import heapq
+from game import Directions, Actions
+
+CLUSTER_SIZE = 10
+# Entrances at least this wide get a transition at both ends
+ENTRANCE_SPLIT = 6
+
+_MOVES = [(action, Actions._directions[action]) for action in
+          [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]]
+
+def getHierarchy(walls, clusterSize=CLUSTER_SIZE):
+    """
+    Returns the ClusterHierarchy of a walls grid, building it the first time
+    it is asked for.  Like game.Adjacency it is kept on the grid itself.
+    """
+    hierarchies = getattr(walls, 'hierarchies', None)
+    if hierarchies == None:
+        hierarchies = walls.hierarchies = {}
+    if clusterSize not in hierarchies:
+        hierarchies[clusterSize] = ClusterHierarchy(walls, clusterSize)
+    return hierarchies[clusterSize]
+
+class ClusterHierarchy:
+    """
+    The abstract graph of a walls grid cut into clusterSize x clusterSize
+    clusters.  Clusters are (cx, cy) pairs; a border is the pair of clusters
+    on either side of it, the left or lower one first.
+    """
+    def __init__(self, walls, clusterSize=CLUSTER_SIZE):
+        self.walls = walls
+        self.ownsWalls = False
+        self.clusterSize = clusterSize
+        self.width, self.height = walls.width, walls.height
+        self.clustersX = (self.width + clusterSize - 1) // clusterSize
+        self.clustersY = (self.height + clusterSize - 1) // clusterSize
+        self.edges = {}
+        self.clusterNodes = {}
+        self.borderTransitions = {}
+        self.nodeBorders = {}
+        self.paths = {}
+        self.expanded = 0
+
+        for cx in range(self.clustersX):
+            for cy in range(self.clustersY):
+                self.clusterNodes[(cx, cy)] = set()
+        for cluster in self.clusterNodes:
+            for border in self.getBorders(cluster):
+                if border not in self.borderTransitions:
+                    self._addEntrances(border)
+        for cluster in self.clusterNodes:
+            self._connectCluster(cluster)
+
+    def getCluster(self, position):
+        x, y = position
+        return (x // self.clusterSize, y // self.clusterSize)
+
+    def getBorders(self, cluster):
+        "The borders of a cluster with its neighbors inside the grid."
+        cx, cy = cluster
+        borders = []
+        if cx > 0: borders.append(((cx - 1, cy), cluster))
+        if cx + 1 < self.clustersX: borders.append((cluster, (cx + 1, cy)))
+        if cy > 0: borders.append(((cx, cy - 1), cluster))
+        if cy + 1 < self.clustersY: borders.append((cluster, (cx, cy + 1)))
+        return borders
+
+    def _isOpen(self, position):
+        x, y = position
+        return 0 <= x < self.width and 0 <= y < self.height and not self.walls[x][y]
+
+    def _borderPairs(self, border):
+        "The (cell, cell) pairs facing each other across a border, in order."
+        (cx, cy), (nx, ny) = border
+        size = self.clusterSize
+        if nx > cx:
+            x = nx * size
+            return [((x - 1, y), (x, y)) for y in range(cy * size, min((cy + 1) * size, self.height))]
+        y = ny * size
+        return [((x, y - 1), (x, y)) for x in range(cx * size, min((cx + 1) * size, self.width))]
+
+    def _addEntrances(self, border):
+        transitions = []
+        run = []
+        for pair in self._borderPairs(border) + [None]:
+            if pair != None and self._isOpen(pair[0]) and self._isOpen(pair[1]):
+                run.append(pair)
+                continue
+            if len(run) >= ENTRANCE_SPLIT:
+                transitions.extend([run[0], run[-1]])
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+
+        self.borderTransitions[border] = transitions
+        for node1, node2 in transitions:
+            for node in (node1, node2):
+                self.nodeBorders.setdefault(node, set()).add(border)
+                self.edges.setdefault(node, {})
+                self.clusterNodes[self.getCluster(node)].add(node)
+            self.edges[node1][node2] = self.edges[node2][node1] = 1
+
+    def _removeEntrances(self, border):
+        for node1, node2 in self.borderTransitions.pop(border, []):
+            del self.edges[node1][node2]
+            del self.edges[node2][node1]
+            for node in (node1, node2):
+                self.nodeBorders[node].discard(border)
+                if self.nodeBorders[node]: continue
+                # The node no longer sits on any entrance
+                del self.nodeBorders[node]
+                for other in self.edges.pop(node):
+                    del self.edges[other][node]
+                self.clusterNodes[self.getCluster(node)].discard(node)
+
+    def _connectCluster(self, cluster):
+        "Recomputes the distances between the nodes of a cluster."
+        nodes = self.clusterNodes[cluster]
+        for node in nodes:
+            for other in [other for other in self.edges[node] if other in nodes]:
+                del self.edges[node][other]
+        for node in nodes:
+            distances, parents = self._searchCluster(node, cluster)
+            for other in nodes:
+                if other != node and other in distances:
+                    self.edges[node][other] = distances[other]
+        self.paths[cluster] = {}
+
+    def _searchCluster(self, start, cluster):
+        """
+        Breadth first search from start that never leaves cluster.  Returns
+        the distance to and the (previousCell, action) parent of every cell
+        it reaches.
+        """
+        size = self.clusterSize
+        left, bottom = cluster[0] * size, cluster[1] * size
+        distances, parents = {start: 0}, {start: None}
+        frontier, distance = [start], 0
+        while frontier:
+            distance += 1
+            nextFrontier = []
+            for x, y in frontier:
+                for action, (dx, dy) in _MOVES:
+                    nextPosition = (x + dx, y + dy)
+                    if nextPosition in distances: continue
+                    if not (left <= x + dx < left + size and bottom <= y + dy < bottom + size): continue
+                    if not self._isOpen(nextPosition): continue
+                    distances[nextPosition] = distance
+                    parents[nextPosition] = ((x, y), action)
+                    nextFrontier.append(nextPosition)
+            frontier = nextFrontier
+        return distances, parents
+
+    def _localPath(self, start, goal, cluster):
+        "The actions of a shortest path from start to goal inside cluster."
+        paths = self.paths[cluster]
+        if (start, goal) not in paths:
+            distances, parents = self._searchCluster(start, cluster)
+            actions, position = [], goal
+            while parents[position] != None:
+                position, action = parents[position]
+                actions.append(action)
+            actions.reverse()
+            paths[(start, goal)] = tuple(actions)
+        return paths[(start, goal)]
+
+    def _linkToCluster(self, position):
+        "Distances from position to the nodes of its cluster (and all its cells)."
+        cluster = self.getCluster(position)
+        distances, parents = self._searchCluster(position, cluster)
+        links = dict(self.edges.get(position, {}))
+        for node in self.clusterNodes[cluster]:
+            if node != position and node in distances:
+                links[node] = distances[node]
+        return links, distances
+
+    def findAbstractPath(self, start, goal):
+        """
+        A* over the abstract graph with the start and goal linked in.
+        Returns the list of nodes from start to goal and its cost, or
+        (None, None) if the goal cannot be reached.  self.expanded counts the
+        expanded nodes.
+        """
+        self.expanded = 0
+        if not self._isOpen(start) or not self._isOpen(goal):
+            return None, None
+        if start == goal:
+            return [start], 0
+        startLinks, startDistances = self._linkToCluster(start)
+        goalLinks, goalDistances = self._linkToCluster(goal)
+        if goal in startDistances:
+            # A path inside the shared cluster; a detour through others may still be shorter
+            startLinks[goal] = startDistances[goal]
+
+        def successors(node):
+            if node == start: links = startLinks.items()
+            else: links = self.edges[node].items()
+            if node in goalLinks and node != start:
+                links = links + [(goal, goalLinks[node])]
+            return links
+
+        gx, gy = goal
+        estimate = lambda (x, y): abs(x - gx) + abs(y - gy)
+        costs, parents = {start: 0}, {start: None}
+        closed = set()
+        frontier = [(estimate(start), 0, start)]
+        while frontier:
+            priority, cost, node = heapq.heappop(frontier)
+            if node in closed: continue
+            if node == goal:
+                path = [goal]
+                while parents[path[-1]] != None:
+                    path.append(parents[path[-1]])
+                path.reverse()
+                return path, cost
+            closed.add(node)
+            self.expanded += 1
+            for neighbor, stepCost in successors(node):
+                if neighbor in closed: continue
+                if neighbor not in costs or cost + stepCost < costs[neighbor]:
+                    costs[neighbor] = cost + stepCost
+                    parents[neighbor] = node
+                    heapq.heappush(frontier, (cost + stepCost + estimate(neighbor), cost + stepCost, neighbor))
+        return None, None
+
+    def getDistance(self, start, goal):
+        "The length of the path findPath would return, or None if there is none."
+        path, cost = self.findAbstractPath(start, goal)
+        return cost
+
+    def findPath(self, start, goal):
+        "The actions of a path from start to goal, or None if there is none."
+        path, cost = self.findAbstractPath(start, goal)
+        if path == None: return None
+        actions = []
+        for node, nextNode in zip(path[:-1], path[1:]):
+            cluster = self.getCluster(node)
+            if cluster == self.getCluster(nextNode):
+                actions.extend(self._localPath(node, nextNode, cluster))
+            else:
+                actions.append(Actions.vectorToDirection((nextNode[0] - node[0], nextNode[1] - node[1])))
+        return actions
+
+    def update(self, cells):
+        """
+        Brings the abstract graph up to date after the walls of the given
+        cells changed, rebuilding only the clusters around them.
+        """
+        clusters = set([self.getCluster(cell) for cell in cells])
+        borders = set()
+        for cluster in clusters:
+            borders.update(self.getBorders(cluster))
+        for border in borders:
+            self._removeEntrances(border)
+        for border in borders:
+            self._addEntrances(border)
+        for border in borders:
+            clusters.update(border)
+        for cluster in clusters:
+            self._connectCluster(cluster)
+
+    def setWalls(self, changes):
+        """
+        Changes the walls at each (position, isWall) pair in changes and
+        updates the hierarchy.  Layouts share their walls grid (see
+        layout.getLayout), so the grid the hierarchy was built on is never
+        written: the first change moves the hierarchy onto a copy of its own,
+        self.walls, which Grid.wallsChanged keeps up to date from then on.
+        getHierarchy on the original grid builds a new hierarchy afterwards.
+        """
+        if not self.ownsWalls:
+            hierarchies = getattr(self.walls, 'hierarchies', None)
+            if hierarchies and hierarchies.get(self.clusterSize) is self:
+                del hierarchies[self.clusterSize]
+            self.walls = self.walls.copy()
+            self.walls.hierarchies = {self.clusterSize: self}
+            self.ownsWalls = True
+        for (x, y), isWall in changes:
+            self.walls[x][y] = isWall
+        self.walls.wallsChanged([position for position, isWall in changes])
@@ -13,12 +13,23 @@
 
 
 from util import manhattanDistance
-from game import Grid
+from game import Grid, Directions, Actions
+from array import array
 import os
 import random
+import cPickle
+import hashlib
 
+# Visibility tables by layout hash (see initializeVisibilityMatrix)
 VISIBILITY_MATRIX_CACHE = {}
 
+# Parsed layouts by (absolute path, modification time)
+LAYOUT_CACHE = {}
+
+# Name of the optional file, next to the .lay files, holding them precompiled
+COMPILED_LAYOUTS = 'layouts.cache'
+COMPILED_CACHE = {}
+
 class Layout:
     """
     A Layout manages the static information about the game board.
@@ -35,47 +46,60 @@ class Layout:
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
-        # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
         return self.numGhosts
 
+    def getHash(self):
+        "A SHA-1 digest of the layout text, identifying layouts with the same board."
+        return hashlib.sha1('\n'.join(self.layoutText)).digest()
+
     def initializeVisibilityMatrix(self):
-        global VISIBILITY_MATRIX_CACHE
-        if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
-            from game import Directions
-            vecs = [(-0.5,0), (0.5,0),(0,-0.5),(0,0.5)]
-            dirs = [Directions.NORTH, Directions.SOUTH, Directions.WEST, Directions.EAST]
-            vis = Grid(self.width, self.height, {Directions.NORTH:set(), Directions.SOUTH:set(), Directions.EAST:set(), Directions.WEST:set(), Directions.STOP:set()})
-            for x in range(self.width):
-                for y in range(self.height):
-                    if self.walls[x][y] == False:
-                        for vec, direction in zip(vecs, dirs):
-                            dx, dy = vec
-                            nextx, nexty = x + dx, y + dy
-                            while (nextx + nexty) != int(nextx) + int(nexty) or not self.walls[int(nextx)][int(nexty)] :
-                                vis[x][y][direction].add((nextx, nexty))
-                                nextx, nexty = x + dx, y + dy
-            self.visibility = vis
-            VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)] = vis
-        else:
-            self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
+        """
+        Computes how far Pacman can see from every cell.  For each direction
+        the table holds, per column, the number of open cells straight ahead
+        of each cell before the first wall; each direction takes one sweep
+        along every column (North, South) or row (East, West), carrying the
+        count over from the neighbouring cell.  Tables are shared by all
+        layouts with the same text.
+        """
+        key = self.getHash()
+        if key not in VISIBILITY_MATRIX_CACHE:
+            width, height, walls = self.width, self.height, self.walls
+            vis = {}
+            for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                vis[direction] = [array('H', [0] * height) for x in range(width)]
+            north, south = vis[Directions.NORTH], vis[Directions.SOUTH]
+            east, west = vis[Directions.EAST], vis[Directions.WEST]
+            for x in range(width):
+                column = walls[x]
+                for y in range(height - 2, -1, -1):
+                    if not column[y + 1]: north[x][y] = north[x][y + 1] + 1
+                for y in range(1, height):
+                    if not column[y - 1]: south[x][y] = south[x][y - 1] + 1
+            for y in range(height):
+                for x in range(width - 2, -1, -1):
+                    if not walls[x + 1][y]: east[x][y] = east[x + 1][y] + 1
+                for x in range(1, width):
+                    if not walls[x - 1][y]: west[x][y] = west[x - 1][y] + 1
+            VISIBILITY_MATRIX_CACHE[key] = vis
+        self.visibility = VISIBILITY_MATRIX_CACHE[key]
 
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
 
-    def getRandomLegalPosition(self):
-        x = random.choice(range(self.width))
-        y = random.choice(range(self.height))
+    def getRandomLegalPosition(self, rng=random):
+        x = rng.choice(range(self.width))
+        y = rng.choice(range(self.height))
         while self.isWall( (x, y) ):
-            x = random.choice(range(self.width))
-            y = random.choice(range(self.height))
+            x = rng.choice(range(self.width))
+            y = rng.choice(range(self.height))
         return (x,y)
 
-    def getRandomCorner(self):
+    def getRandomCorner(self, rng=random):
         poses = [(1,1), (1, self.height - 2), (self.width - 2, 1), (self.width - 2, self.height - 2)]
-        return random.choice(poses)
+        return rng.choice(poses)
 
     def getFurthestCorner(self, pacPos):
         poses = [(1,1), (1, self.height - 2), (self.width - 2, 1), (self.width - 2, self.height - 2)]
@@ -83,14 +107,41 @@ class Layout:
         return pos
 
     def isVisibleFrom(self, ghostPos, pacPos, pacDirection):
+        """
+        Whether a ghost at ghostPos (possibly between two cells) is straight
+        ahead of Pacman with no wall in between.  Pacman sees nothing while
+        stopped.
+        """
+        if getattr(self, 'visibility', None) == None: self.initializeVisibilityMatrix()
+        if pacDirection not in self.visibility: return False
         row, col = [int(x) for x in pacPos]
-        return ghostPos in self.visibility[row][col][pacDirection]
+        gx, gy = ghostPos
+        dx, dy = Actions.directionToVector(pacDirection)
+        if dx == 0:
+            if gx != row: return False
+            ahead = (gy - col) * dy
+        else:
+            if gy != col: return False
+            ahead = (gx - row) * dx
+        return 0 < ahead <= self.visibility[pacDirection][row][col]
 
     def __str__(self):
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        """
+        Copies the layout without parsing it again.  The walls are never
+        changed after parsing, so the copy shares them (and the adjacency
+        table cached on them); the food, capsules and agent positions are
+        copied.
+        """
+        import copy
+        layout = copy.copy(self)
+        layout.layoutText = self.layoutText[:]
+        layout.food = self.food.copy()
+        layout.capsules = self.capsules[:]
+        layout.agentPositions = self.agentPositions[:]
+        return layout
 
     def processLayoutText(self, layoutText):
         """
@@ -129,21 +180,87 @@ class Layout:
             self.agentPositions.append( (int(layoutChar), (x,y)))
             self.numGhosts += 1
 def getLayout(name, back = 2):
+    """
+    Loads a layout by name, looking in layouts/ and the current directory and
+    then in the same places up to 'back' parent directories higher.
+    """
     if name.endswith('.lay'):
-        layout = tryToLoad('layouts/' + name)
-        if layout == None: layout = tryToLoad(name)
+        candidates = ['layouts/' + name, name]
     else:
-        layout = tryToLoad('layouts/' + name + '.lay')
-        if layout == None: layout = tryToLoad(name + '.lay')
-    if layout == None and back >= 0:
-        curdir = os.path.abspath('.')
-        os.chdir('..')
-        layout = getLayout(name, back -1)
-        os.chdir(curdir)
+        candidates = ['layouts/' + name + '.lay', name + '.lay']
+    layout = None
+    for up in range(back + 2):
+        for candidate in candidates:
+            layout = tryToLoad(os.path.join(*([os.pardir] * up + [candidate])))
+            if layout != None: break
+        if layout != None: break
+    if layout != None: layout.name = name
     return layout
 
 def tryToLoad(fullname):
-    if(not os.path.exists(fullname)): return None
-    f = open(fullname)
-    try: return Layout([line.strip() for line in f])
+    """
+    Loads a layout file, or returns None if it does not exist.  A file is only
+    parsed once per process (and not at all if it is in a compiled layouts
+    file next to it, see compileLayouts) until it is modified; every call
+    returns a separate copy.
+    """
+    try: mtime = os.path.getmtime(fullname)
+    except OSError: return None
+    key = (os.path.abspath(fullname), mtime)
+    if key not in LAYOUT_CACHE:
+        layout = loadCompiled(fullname, mtime)
+        if layout == None:
+            f = open(fullname)
+            try: layout = Layout([line.strip() for line in f])
+            finally: f.close()
+        LAYOUT_CACHE[key] = layout
+    return LAYOUT_CACHE[key].deepCopy()
+
+def loadCompiled(fullname, mtime):
+    "Looks a layout file up in the compiled layouts of its directory."
+    directory, filename = os.path.split(os.path.abspath(fullname))
+    if directory not in COMPILED_CACHE:
+        compiled = {}
+        path = os.path.join(directory, COMPILED_LAYOUTS)
+        if os.path.exists(path):
+            f = open(path, 'rb')
+            try: compiled = cPickle.load(f)
+            except Exception: compiled = {}
+            finally: f.close()
+        COMPILED_CACHE[directory] = compiled
+    entry = COMPILED_CACHE[directory].get(filename)
+    if entry == None or entry[0] != mtime: return None
+    try: return cPickle.loads(entry[1])
+    except Exception: return None
+
+def compileLayouts(directory='layouts'):
+    """
+    Parses every .lay file in a directory and stores the parsed layouts in
+    one file there, which tryToLoad unpickles instead of parsing the text.
+    Entries for files modified since are ignored.
+    """
+    compiled = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.lay'): continue
+        fullname = os.path.join(directory, filename)
+        f = open(fullname)
+        try: layout = Layout([line.strip() for line in f])
+        finally: f.close()
+        compiled[filename] = (os.path.getmtime(fullname), cPickle.dumps(layout, cPickle.HIGHEST_PROTOCOL))
+    f = open(os.path.join(directory, COMPILED_LAYOUTS), 'wb')
+    try: cPickle.dump(compiled, f, cPickle.HIGHEST_PROTOCOL)
     finally: f.close()
+    return len(compiled)
+
+if __name__ == '__main__':
+    """
+    Precompiles the layouts:
+
+    > python layout.py [directory]
+    """
+    import sys
+    # Pickle the layouts as layout.Layout rather than __main__.Layout
+    import layout
+    directory = 'layouts'
+    if len(sys.argv) > 1: directory = sys.argv[1]
+    print 'Compiled %d layouts into %s' % (layout.compileLayouts(directory), os.path.join(directory, COMPILED_LAYOUTS))
@@ -0,0 +1,201 @@
+# layoutGenerator.py
+# ------------------
+"""
+Generates layouts of any size, for testing how search and simulation scale
+beyond the bundled mazes.
+
+Three kinds of boards are supported:
+
+  perfect   a maze with exactly one path between any two cells (randomized
+            depth-first carving)
+  braided   a perfect maze with a share of its dead ends knocked through,
+            so there are loops and many paths between cells
+  rooms     open rooms separated by walls with doorways (recursive
+            division)
+
+Pacman starts in the top right corner and the first food dot is placed in the
+bottom left corner, (1, 1), which is where PositionSearchProblem looks for
+its goal.  More food, ghosts and capsules are scattered over random open
+cells.  The same seed always produces the same layout.
+
+To write a 501x501 braided maze with 4 ghosts:
+
+> python layoutGenerator.py -W 501 -H 501 -s braided -g 4 --seed 1 -o layouts/braided501.lay
+"""
+
+import util
+import layout
+
+STYLES = ['perfect', 'braided', 'rooms']
+
+def generateMaze(width, height, style='perfect', seed=None, braid=0.5, minRoom=4):
+    """
+    Returns a width x height grid of booleans (grid[x][y] is True for walls)
+    surrounded by walls.  Mazes are carved on the cells with odd coordinates,
+    so odd sizes use the whole board; an even size leaves a second wall along
+    the right or top edge.
+    """
+    if width < 5 or height < 5: raise Exception('Layouts must be at least 5x5')
+    if style not in STYLES: raise Exception('Unknown maze style ' + style)
+    rng = util.RandomStream(seed)
+    if style == 'rooms':
+        return _divide(width, height, rng, minRoom)
+    walls = _carve(width, height, rng)
+    if style == 'braided':
+        _braid(walls, rng, braid)
+    return walls
+
+def _carve(width, height, rng):
+    "A perfect maze by depth-first search with an explicit stack."
+    walls = [[True] * height for x in range(width)]
+    cellsX, cellsY = (width - 1) // 2, (height - 1) // 2
+    visited = [[False] * cellsY for x in range(cellsX)]
+    visited[0][0] = True
+    walls[1][1] = False
+    stack = [(0, 0)]
+    while stack:
+        cx, cy = stack[-1]
+        options = []
+        for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
+            nx, ny = cx + dx, cy + dy
+            if 0 <= nx < cellsX and 0 <= ny < cellsY and not visited[nx][ny]:
+                options.append((nx, ny))
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(options)
+        visited[nx][ny] = True
+        # Open the cell and the wall between it and the current one
+        walls[2 * nx + 1][2 * ny + 1] = False
+        walls[cx + nx + 1][cy + ny + 1] = False
+        stack.append((nx, ny))
+    return walls
+
+def _braid(walls, rng, braid):
+    "Knocks a wall out of each dead end with probability braid."
+    width, height = len(walls), len(walls[0])
+    for x in range(1, width - 1, 2):
+        for y in range(1, height - 1, 2):
+            if walls[x][y]: continue
+            closed = [(dx, dy) for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)] if walls[x + dx][y + dy]]
+            if len(closed) != 3 or rng.random() >= braid: continue
+            # Only knock through to a cell inside the border
+            closed = [(dx, dy) for dx, dy in closed if 0 < x + 2 * dx < width - 1 and 0 < y + 2 * dy < height - 1]
+            if closed:
+                dx, dy = rng.choice(closed)
+                walls[x + dx][y + dy] = False
+
+def _divide(width, height, rng, minRoom):
+    """
+    Open rooms by recursive division: each chamber is split by a wall with a
+    doorway until it is smaller than minRoom in both directions.
+    """
+    walls = [[False] * height for x in range(width)]
+    for x in range(width):
+        walls[x][0] = walls[x][height - 1] = True
+    for y in range(height):
+        walls[0][y] = walls[width - 1][y] = True
+
+    # Chambers are (left, bottom, right, top) inclusive bounds of open cells;
+    # walls go on even coordinates and doors on odd ones, so a door is never
+    # blocked by a later wall
+    chambers = [(1, 1, width - 2 - (width + 1) % 2, height - 2 - (height + 1) % 2)]
+    while chambers:
+        left, bottom, right, top = chambers.pop()
+        w, h = right - left + 1, top - bottom + 1
+        if w < minRoom and h < minRoom: continue
+        horizontal = h > w or (h == w and rng.random() < 0.5)
+        if horizontal:
+            candidates = range(bottom + 1, top, 2)
+            if not candidates: continue
+            y = rng.choice(candidates)
+            door = rng.choice(range(left, right + 1, 2))
+            for x in range(left, right + 1):
+                if x != door: walls[x][y] = True
+            chambers.append((left, bottom, right, y - 1))
+            chambers.append((left, y + 1, right, top))
+        else:
+            candidates = range(left + 1, right, 2)
+            if not candidates: continue
+            x = rng.choice(candidates)
+            door = rng.choice(range(bottom, top + 1, 2))
+            for y in range(bottom, top + 1):
+                if y != door: walls[x][y] = True
+            chambers.append((left, bottom, x - 1, top))
+            chambers.append((x + 1, bottom, right, top))
+    return walls
+
+def generateLayoutText(width, height, style='perfect', seed=None, numFood=1, numGhosts=0,
+                       numCapsules=0, braid=0.5, minRoom=4):
+    """
+    Returns the lines of a .lay file.  numFood counts the dot at (1, 1); a
+    negative numFood puts food on every free cell.
+    """
+    walls = generateMaze(width, height, style, seed, braid, minRoom)
+    rng = util.RandomStream(seed).split('placement')
+    board = [[walls[x][y] and '%' or ' ' for y in range(height)] for x in range(width)]
+
+    start = (width - 2 - (width + 1) % 2, height - 2 - (height + 1) % 2)
+    board[start[0]][start[1]] = 'P'
+    board[1][1] = '.'
+    free = [(x, y) for x in range(width) for y in range(height) if board[x][y] == ' ']
+    rng.shuffle(free)
+
+    def place(char, count):
+        for i in range(min(count, len(free))):
+            x, y = free.pop()
+            board[x][y] = char
+
+    place('G', numGhosts)
+    place('o', numCapsules)
+    if numFood < 0: numFood = len(free) + 1
+    place('.', numFood - 1)
+    return [''.join([board[x][y] for x in range(width)]) for y in range(height - 1, -1, -1)]
+
+def generateLayout(width, height, style='perfect', seed=None, **placement):
+    "Returns a generated Layout (see generateLayoutText for the options)."
+    theLayout = layout.Layout(generateLayoutText(width, height, style, seed, **placement))
+    theLayout.name = '%s%dx%d-%s' % (style, width, height, seed)
+    return theLayout
+
+def writeLayout(layoutText, path):
+    f = open(path, 'w')
+    try: f.write('\n'.join(layoutText) + '\n')
+    finally: f.close()
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE:      python layoutGenerator.py <options>')
+    parser.add_option('-W', '--width', dest='width', type='int', default=101,
+                      help='the width of the layout [Default: %default]')
+    parser.add_option('-H', '--height', dest='height', type='int', default=101,
+                      help='the height of the layout [Default: %default]')
+    parser.add_option('-s', '--style', dest='style', default='perfect',
+                      help='perfect, braided or rooms [Default: %default]')
+    parser.add_option('--seed', dest='seed', type='int', default=None,
+                      help='Seed for the maze and the placements')
+    parser.add_option('-f', '--food', dest='numFood', type='int', default=1,
+                      help='Number of food dots, -1 for every free cell [Default: %default]')
+    parser.add_option('-g', '--ghosts', dest='numGhosts', type='int', default=0,
+                      help='Number of ghosts [Default: %default]')
+    parser.add_option('-c', '--capsules', dest='numCapsules', type='int', default=0,
+                      help='Number of capsules [Default: %default]')
+    parser.add_option('-b', '--braid', dest='braid', type='float', default=0.5,
+                      help='Share of dead ends a braided maze opens up [Default: %default]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='The .lay file to write (the layout is printed otherwise)')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+if __name__ == '__main__':
+    import sys
+    options = readCommand(sys.argv[1:])
+    text = generateLayoutText(options.width, options.height, options.style, options.seed,
+                              options.numFood, options.numGhosts, options.numCapsules, options.braid)
+    if options.output == None:
+        print '\n'.join(text)
+    else:
+        writeLayout(text, options.output)
+        print 'Wrote a %dx%d %s layout to %s' % (options.width, options.height, options.style, options.output)
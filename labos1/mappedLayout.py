@@ -0,0 +1,217 @@
+# mappedLayout.py
+# ---------------
+"""
+Memory-mapped storage for the walls and distance tables of very large
+layouts.
+
+A Grid keeps its cells in the memory of the process that built it, and a
+table of maze distances held as Python objects costs dozens of bytes per
+entry.  The classes here keep them in .npy files instead, opened with
+numpy.memmap: the operating system pages the files in on demand, and every
+process that maps the same file (for example the workers of pacman.py -w)
+shares one physical copy.
+
+  MappedGrid       a read-only Grid over a mapped walls bitmap
+  mapLayout        a copy of a Layout whose walls are a MappedGrid
+  DistanceTable    BFS distances from a set of source cells to every cell,
+                   built straight into a mapped file
+
+Files are named after the layout's hash (Layout.getHash), so processes
+working on the same layout find each other's files.
+"""
+
+import os
+from game import Grid, Actions
+
+try:
+    import numpy
+    _NUMPY_ENABLED = True
+except:
+    _NUMPY_ENABLED = False
+
+UNREACHABLE = -1
+
+def _requireNumpy():
+    if not _NUMPY_ENABLED:
+        raise Exception('Memory-mapped layouts require numpy')
+
+def layoutFilePrefix(theLayout, directory):
+    "The path prefix of the mapped files of a layout in a directory."
+    return os.path.join(directory, theLayout.getHash().encode('hex'))
+
+def _saveAtomically(path, array):
+    "Writes an .npy file under a temporary name first, so readers never see half of it."
+    temporary = '%s.%d.tmp' % (path, os.getpid())
+    f = open(temporary, 'wb')
+    try: numpy.save(f, array)
+    finally: f.close()
+    os.rename(temporary, path)
+
+class MappedGrid:
+    """
+    A read-only Grid of walls backed by a memory-mapped (width, height) array.
+    grid[x][y] reads a cell as in Grid; copy() returns an ordinary, writable
+    Grid.
+    """
+    def __init__(self, path):
+        _requireNumpy()
+        self.path = path
+        self.data = numpy.load(path, mmap_mode='r')
+        self.width, self.height = self.data.shape
+
+    def save(grid, path):
+        "Writes a Grid's cells to an .npy file that MappedGrid can map."
+        _requireNumpy()
+        cells = numpy.zeros((grid.width, grid.height), dtype=numpy.uint8)
+        for x, y in grid.asList():
+            cells[x, y] = 1
+        _saveAtomically(path, cells)
+    save = staticmethod(save)
+
+    def __getitem__(self, i):
+        return self.data[i]
+
+    def __setitem__(self, key, item):
+        raise Exception('A MappedGrid is read-only; copy() it first')
+
+    def __getstate__(self):
+        # Pickles (for example to worker processes) carry only the path
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def __str__(self):
+        return str(self.copy())
+
+    def __eq__(self, other):
+        if other == None: return False
+        return self.copy() == other.copy()
+
+    def __hash__(self):
+        return hash(self.copy())
+
+    def copy(self):
+        g = Grid(self.width, self.height)
+        for x in range(self.width):
+            g.data[x] = bytearray(self.data[x].tostring())
+        return g
+
+    def deepCopy(self):
+        # Read-only, so copies can share the mapping
+        return self
+
+    def shallowCopy(self):
+        return self
+
+    def count(self, item =True ):
+        walls = int(numpy.count_nonzero(self.data))
+        if item: return walls
+        return self.width * self.height - walls
+
+    def asList(self, key = True):
+        if key: xs, ys = numpy.nonzero(self.data)
+        else: xs, ys = numpy.nonzero(self.data == 0)
+        return zip(xs.tolist(), ys.tolist())
+
+    def packBits(self):
+        return self.copy().packBits()
+
+def mapLayout(theLayout, directory):
+    """
+    Returns a copy of theLayout whose walls are mapped from a file in
+    directory, writing the file first if no process has yet.
+    """
+    _requireNumpy()
+    if not os.path.isdir(directory): os.makedirs(directory)
+    path = layoutFilePrefix(theLayout, directory) + '-walls.npy'
+    if not os.path.exists(path):
+        MappedGrid.save(theLayout.walls, path)
+    mapped = theLayout.deepCopy()
+    mapped.walls = MappedGrid(path)
+    return mapped
+
+class DistanceTable:
+    """
+    Maze distances from a set of source cells to every cell of a layout, in a
+    memory-mapped (sources, width * height) int32 array.  Cell (x, y) has
+    column x * height + y, as in game.Adjacency; unreachable cells hold
+    UNREACHABLE.
+
+    >>> table = DistanceTable.build(theLayout, 'maps')       # all open cells
+    >>> table.getDistance((1, 1), (35, 35))
+
+    All-pairs tables grow with the square of the number of open cells, so for
+    giant layouts pass the cells you need (food, corners, junctions) as
+    sources.  Distances are symmetric, so only one end of a query has to be a
+    source.
+    """
+    def __init__(self, prefix):
+        _requireNumpy()
+        self.prefix = prefix
+        self.sources = numpy.load(prefix + '-sources.npy', mmap_mode='r')
+        self.distances = numpy.load(prefix + '-distances.npy', mmap_mode='r')
+        # The first entry of the sources file is the layout height
+        self.height = int(self.sources[0])
+        self.sourceRows = dict([(int(index), row) for row, index in enumerate(self.sources[1:])])
+
+    def build(theLayout, directory, sources=None, name='all'):
+        """
+        Computes (or reuses) the distance table of a layout.  sources is a list
+        of positions, all open cells by default; name tells tables with
+        different sources apart.
+        """
+        _requireNumpy()
+        from numpy.lib.format import open_memmap
+        if not os.path.isdir(directory): os.makedirs(directory)
+        prefix = '%s-%s' % (layoutFilePrefix(theLayout, directory), name)
+        if os.path.exists(prefix + '-distances.npy'):
+            return DistanceTable(prefix)
+
+        walls = theLayout.walls
+        width, height = walls.width, walls.height
+        if sources == None: sources = walls.asList(False)
+        adjacency = Actions.getAdjacency(walls)
+
+        # Fill the table row by row in a temporary mapped file, so it never has
+        # to fit in memory
+        temporary = '%s-distances.npy.%d.tmp' % (prefix, os.getpid())
+        table = open_memmap(temporary, mode='w+', dtype=numpy.int32, shape=(len(sources), width * height))
+        moves = adjacency.moves
+        for i, source in enumerate(sources):
+            row = [UNREACHABLE] * (width * height)
+            start = adjacency.getIndex(source)
+            row[start] = 0
+            frontier, distance = [start], 0
+            while frontier:
+                distance += 1
+                nextFrontier = []
+                for cell in frontier:
+                    for neighbor, action in moves[cell]:
+                        if row[neighbor] == UNREACHABLE:
+                            row[neighbor] = distance
+                            nextFrontier.append(neighbor)
+                frontier = nextFrontier
+            table[i] = row
+        table.flush()
+        del table
+        # The distances file appears last, once the table is complete
+        _saveAtomically(prefix + '-sources.npy', numpy.array([height] + [adjacency.getIndex(s) for s in sources], dtype=numpy.int64))
+        os.rename(temporary, prefix + '-distances.npy')
+        return DistanceTable(prefix)
+    build = staticmethod(build)
+
+    def getDistance(self, position1, position2):
+        """
+        The maze distance between two cells, or None if neither is a source
+        (or the table does not know the cells).  Unreachable pairs return
+        UNREACHABLE.
+        """
+        x1, y1 = position1
+        x2, y2 = position2
+        index1, index2 = int(x1) * self.height + int(y1), int(x2) * self.height + int(y2)
+        if index1 in self.sourceRows:
+            return int(self.distances[self.sourceRows[index1], index2])
+        if index2 in self.sourceRows:
+            return int(self.distances[self.sourceRows[index2], index1])
+        return None
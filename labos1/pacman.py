@@ -161,6 +161,16 @@ class GameState:
     def getGhostPositions(self):
         return [s.getPosition() for s in self.getGhostStates()]
 
+    def getVisibleGhosts(self):
+        """
+        Returns the AgentStates of the ghosts Pacman can see straight ahead
+        (see Layout.isVisibleFrom).
+        """
+        configuration = self.getPacmanState().configuration
+        pos, direction = configuration.getPosition(), configuration.getDirection()
+        layout = self.data.layout
+        return [ghost for ghost in self.getGhostStates() if layout.isVisibleFrom(ghost.getPosition(), pos, direction)]
+
     def getNumAgents( self ):
         return len( self.data.agentStates )
 
@@ -271,11 +281,11 @@ class ClassicGameRules:
     def __init__(self, timeout=30):
         self.timeout = timeout
 
-    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False):
+    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False, rng=None):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize( layout, len(ghostAgents) )
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions, rng=rng)
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
@@ -509,10 +519,16 @@ def readCommand( argv ):
                       help=default('Zoom the size of the graphics window'), default=1.0)
     parser.add_option('-f', '--fixRandomSeed', action='store_true', dest='fixRandomSeed',
                       help='Fixes the random seed to always play the same game', default=False)
+    parser.add_option('--seed', dest='seed', type='int',
+                      help='Seed for the random streams of the games; the same seed plays the same games with any number of workers', default=None)
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
                       help='Writes game histories to a file (named by the time they were played)', default=False)
+    parser.add_option('--recordCheckpoints', dest='recordCheckpoints', type='int',
+                      help=default('Store a full game state every N moves of a recording, 0 for none'), default=0)
     parser.add_option('--replay', dest='gameToReplay',
-                      help='A recorded game file (pickle) to replay', default=None)
+                      help='A recorded game file to replay', default=None)
+    parser.add_option('--replayFrom', dest='replayFrom', type='int',
+                      help=default('The move to start a replay from'), default=0)
     parser.add_option('-a','--agentArgs',dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
@@ -523,6 +539,10 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('-w', '--workers', dest='workers', type='int',
+                      help=default('Number of processes to spread the games over (requires -q)'), default=1)
+    parser.add_option('--mapLayout', dest='mapLayout', metavar='DIR',
+                      help='Keep the walls of the layout in a memory-mapped file in DIR, shared by all processes (requires numpy)', default=None)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -535,6 +555,9 @@ def readCommand( argv ):
     # Choose a layout
     args['layout'] = layout.getLayout( options.layout )
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
+    if options.mapLayout != None:
+        import mappedLayout
+        args['layout'] = mappedLayout.mapLayout(args['layout'], options.mapLayout)
 
     # Choose a Pacman agent
     noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics)
@@ -568,12 +591,30 @@ def readCommand( argv ):
         args['display'] = graphicsDisplay.PacmanGraphics(options.zoom, frameTime = options.frameTime)
     args['numGames'] = options.numGames
     args['record'] = options.record
+    if options.recordCheckpoints > 0:
+        args['recordCheckpoints'] = options.recordCheckpoints
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    if options.seed != None:
+        args['seed'] = options.seed
+    if options.workers > 1:
+        if not options.quietGraphics:
+            raise Exception('Running games in several processes requires -q')
+        if options.numTraining > 0:
+            # Every worker would train its own copy of the agent
+            raise Exception('Training games can not be spread over several processes; drop -w or -x')
+        args['workers'] = options.workers
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
         print 'Replaying recorded game %s.' % options.gameToReplay
+        import gameRecording
+        if gameRecording.isRecording(options.gameToReplay):
+            reader = gameRecording.RecordingReader(options.gameToReplay)
+            try: replayRecording(reader, args['display'], options.replayFrom)
+            finally: reader.close()
+            sys.exit(0)
+        # Games recorded before the binary format are pickles
         import cPickle
         f = open(options.gameToReplay)
         try: recorded = cPickle.load(f)
@@ -625,34 +666,122 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+def replayRecording( reader, display, startMove=0 ):
+    """
+    Replays a binary recording (see gameRecording.py), starting from the
+    game state after startMove moves.
+    """
+    import pacmanAgents, ghostAgents
+    rules = ClassicGameRules()
+    layout = reader.getLayout()
+    agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i+1) for i in range(reader.numAgents - 1)]
+    game = rules.newGame( layout, agents[0], agents[1:], display )
+    state = reader.getStateAt(startMove)
+    display.initialize(state.data)
+
+    for action in reader.getActions(startMove):
+        # Execute the action
+        state = state.generateSuccessor( *action )
+        # Change the display
+        display.update( state.data )
+        # Allow for game specific conditions (winning, losing, etc.)
+        rules.process(state, game)
+
+    display.finish()
+
+class GameResult:
+    """
+    The parts of a finished Game that runGames reports on.  Worker processes
+    send these back instead of the Game itself, whose agents and display
+    may not be picklable.
+    """
+    def __init__( self, game ):
+        self.state = game.state
+        self.moveHistory = game.moveHistory
+        self.agentCrashed = game.agentCrashed
+        self.agentTimeout = game.agentTimeout
+        self.totalAgentTimes = game.totalAgentTimes
+
+def recordGame( layout, game, gameNumber, checkpointInterval=0 ):
+    import time, gameRecording
+    fname = ('recorded-game-%d' % gameNumber) +  '-'.join([str(t) for t in time.localtime()[1:6]]) + '.rec'
+    gameRecording.writeRecording(fname, layout, game.moveHistory, game.state, checkpointInterval)
+
+# Set by runGamesInWorkers before the pool forks, so the workers inherit the
+# agents instead of having to unpickle them
+_WORKER_GAME_ARGS = None
+
+def gameStream( streams, i ):
+    """
+    The random stream of game number i.  The global random module is reseeded
+    from it as well, for agents that do not draw from their own stream, so
+    game i plays out the same whether it runs serially or in a worker.
+    """
+    stream = streams.split(i)
+    random.seed(stream.split('global').streamSeed)
+    return stream
+
+def _runWorkerGame( i ):
+    """
+    Plays game number i in a worker process with a NullGraphics display.
+    """
+    import textDisplay
+    layout, pacman, ghosts, rules, numTraining, record, recordCheckpoints, catchExceptions, streams = _WORKER_GAME_ARGS
+    beQuiet = i < numTraining
+    rules.quiet = beQuiet
+    game = rules.newGame( layout, pacman, ghosts, textDisplay.NullGraphics(), beQuiet, catchExceptions, gameStream(streams, i))
+    game.run()
+    if record: recordGame(layout, game, i + 1, recordCheckpoints)
+    return GameResult(game)
+
+def runGamesInWorkers( layout, pacman, ghosts, rules, numGames, record, recordCheckpoints, numTraining, catchExceptions, workers, streams ):
+    """
+    Plays the games in a pool of worker processes and returns their results
+    in game order.  Game i draws from streams.split(i) wherever it is played.
+    """
+    global _WORKER_GAME_ARGS
+    import multiprocessing
+    _WORKER_GAME_ARGS = (layout, pacman, ghosts, rules, numTraining, record, recordCheckpoints, catchExceptions, streams)
+    pool = multiprocessing.Pool(workers)
+    try:
+        results = []
+        for result in pool.imap(_runWorkerGame, range(numGames)):
+            results.append(result)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        _WORKER_GAME_ARGS = None
+    return results
+
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, workers=1, recordCheckpoints=0, seed=None ):
     import __main__
     __main__.__dict__['_display'] = display
 
     rules = ClassicGameRules(timeout)
     games = []
+    # Without a seed one is drawn from the global random module (fixed by -f)
+    streams = util.RandomStream(seed)
 
-    for i in range( numGames ):
-        beQuiet = i < numTraining
-        if beQuiet:
-                # Suppress output and graphics
-            import textDisplay
-            gameDisplay = textDisplay.NullGraphics()
-            rules.quiet = True
-        else:
-            gameDisplay = display
-            rules.quiet = False
-        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
-        game.run()
-        if not beQuiet: games.append(game)
-
-        if record:
-            import time, cPickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            cPickle.dump(components, f)
-            f.close()
+    if workers > 1:
+        results = runGamesInWorkers(layout, pacman, ghosts, rules, numGames, record, recordCheckpoints, numTraining, catchExceptions, workers, streams)
+        games = results[numTraining:]
+    else:
+        for i in range( numGames ):
+            beQuiet = i < numTraining
+            if beQuiet:
+                    # Suppress output and graphics
+                import textDisplay
+                gameDisplay = textDisplay.NullGraphics()
+                rules.quiet = True
+            else:
+                gameDisplay = display
+                rules.quiet = False
+            game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions, gameStream(streams, i))
+            game.run()
+            if not beQuiet: games.append(game)
+
+            if record: recordGame(layout, game, i + 1, recordCheckpoints)
 
     if (numGames-numTraining) > 0:
         scores = [game.state.getScore() for game in games]
@@ -46,7 +46,7 @@ class GreedyAgent(Agent):
         scored = [(self.evaluationFunction(state), action) for state, action in successors]
         bestScore = max(scored)[0]
         bestActions = [pair[1] for pair in scored if pair[0] == bestScore]
-        return random.choice(bestActions)
+        return self.rng.choice(bestActions)
 
 def scoreEvaluation(state):
     return state.getScore()
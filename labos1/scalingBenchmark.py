@@ -0,0 +1,171 @@
+# scalingBenchmark.py
+# -------------------
+"""
+Measures how the search algorithms in search.py scale with the size of the
+maze.  For every size and algorithm a layout is generated (see
+layoutGenerator.py) and a PositionSearchProblem from the top right corner to
+(1, 1) is solved in a fresh child process, which reports:
+
+  seconds    time spent in the search function
+  expanded   number of expanded search nodes
+  cost       cost of the path found
+  memory     growth of the child's peak resident set size during the
+             search, in kilobytes
+
+Runs longer than the timeout are stopped, and runs that crash (or run out of
+stack in SearchNode.backtrack on very long paths) are reported as failed.  With
+matplotlib installed, the results can also be plotted:
+
+> python scalingBenchmark.py -s 25,51,101,201 -a bfs,astar --plot scaling.png
+"""
+
+import sys, time
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as pyplot
+    _MATPLOTLIB_ENABLED = True
+except:
+    _MATPLOTLIB_ENABLED = False
+
+HEURISTICS = {'astar': 'manhattanHeuristic'}
+
+def peakMemory():
+    "The peak resident set size of this process in kilobytes."
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin': peak //= 1024
+    return peak
+
+def runSearch(size, algorithm, style, seed, results):
+    """
+    Solves one generated maze in the current process and puts the
+    measurements on the results queue.
+    """
+    import layoutGenerator, search, searchAgents, pacman
+    theLayout = layoutGenerator.generateLayout(size, size, style, seed)
+    state = pacman.GameState()
+    state.initialize(theLayout, 0)
+    problem = searchAgents.PositionSearchProblem(state, warn=False, visualize=False)
+    function = getattr(search, algorithm)
+    if algorithm in HEURISTICS:
+        heuristic = getattr(searchAgents, HEURISTICS[algorithm])
+        solve = lambda: function(problem, heuristic=heuristic)
+    else:
+        solve = lambda: function(problem)
+
+    # Paths in large mazes are long and backtrack recurses along them
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * size * size))
+    before = peakMemory()
+    start = time.time()
+    try:
+        actions = solve()
+    except Exception, e:
+        results.put('%s: %s' % (e.__class__.__name__, str(e)[:60]))
+        return
+    seconds = time.time() - start
+    results.put((seconds, problem._expanded, problem.getCostOfActions(actions), peakMemory() - before))
+
+def measure(size, algorithm, style='perfect', seed=1, timeout=60):
+    """
+    Runs runSearch in a child process, so that memory is measured from a
+    clean start and a slow search can be stopped.  Returns the measurements,
+    an error message if the search failed, or None if it did not finish
+    within timeout seconds.
+    """
+    import multiprocessing
+    results = multiprocessing.Queue()
+    child = multiprocessing.Process(target=runSearch, args=(size, algorithm, style, seed, results))
+    child.start()
+    try:
+        return results.get(timeout=timeout)
+    except Exception:
+        if child.exitcode not in (None, 0): return 'exit code %d' % child.exitcode
+        return None
+    finally:
+        if child.is_alive(): child.terminate()
+        child.join()
+
+def runBenchmark(sizes, algorithms, style='perfect', seed=1, timeout=60):
+    """
+    Measures every algorithm on every size and returns a dictionary from
+    algorithm to a list of (size, measurements) pairs.  Once an algorithm
+    times out or fails, larger sizes are skipped for it.
+    """
+    table = {}
+    print '%-8s %6s %10s %10s %8s %10s' % ('search', 'size', 'seconds', 'expanded', 'cost', 'memory KB')
+    for algorithm in algorithms:
+        table[algorithm] = []
+        for size in sizes:
+            result = measure(size, algorithm, style, seed, timeout)
+            table[algorithm].append((size, result))
+            if result == None:
+                print '%-8s %6d   timed out after %d seconds' % (algorithm, size, timeout)
+                break
+            if type(result) == str:
+                print '%-8s %6d   failed (%s)' % (algorithm, size, result)
+                break
+            print '%-8s %6d %10.3f %10d %8d %10d' % ((algorithm, size) + result)
+    return table
+
+def writeTable(table, path):
+    f = open(path, 'w')
+    try:
+        f.write('search,size,seconds,expanded,cost,memory\n')
+        for algorithm in sorted(table.keys()):
+            for size, result in table[algorithm]:
+                if result == None or type(result) == str: continue
+                f.write('%s,%d,%f,%d,%d,%d\n' % ((algorithm, size) + result))
+    finally: f.close()
+
+def plotTable(table, path):
+    "Plots time and memory against the number of cells of the layout."
+    if not _MATPLOTLIB_ENABLED:
+        print 'Plotting requires matplotlib'
+        return
+    figure, (timeAxes, memoryAxes) = pyplot.subplots(1, 2, figsize=(12, 5))
+    for algorithm in sorted(table.keys()):
+        points = [(size * size, result) for size, result in table[algorithm] if type(result) == tuple]
+        if not points: continue
+        cells = [cells for cells, result in points]
+        timeAxes.plot(cells, [result[0] for cells, result in points], marker='o', label=algorithm)
+        memoryAxes.plot(cells, [result[3] for cells, result in points], marker='o', label=algorithm)
+    for axes, label in [(timeAxes, 'seconds'), (memoryAxes, 'peak memory growth (KB)')]:
+        axes.set_xscale('log')
+        axes.set_yscale('symlog')
+        axes.set_xlabel('cells in layout')
+        axes.set_ylabel(label)
+        axes.legend(loc='upper left')
+    figure.savefig(path)
+    print 'Plot written to', path
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE:      python scalingBenchmark.py <options>')
+    parser.add_option('-s', '--sizes', dest='sizes', default='25,51,101,201,501',
+                      help='Comma separated layout sizes [Default: %default]')
+    parser.add_option('-a', '--algorithms', dest='algorithms', default='dfs,bfs,ucs,astar',
+                      help='Comma separated search functions [Default: %default]')
+    parser.add_option('-m', '--maze', dest='style', default='perfect',
+                      help='perfect, braided or rooms [Default: %default]')
+    parser.add_option('--seed', dest='seed', type='int', default=1,
+                      help='Seed for the generated layouts [Default: %default]')
+    parser.add_option('-t', '--timeout', dest='timeout', type='int', default=60,
+                      help='Seconds before a search is stopped [Default: %default]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='A CSV file to write the results to')
+    parser.add_option('--plot', dest='plot', default=None,
+                      help='An image file to plot the results to (requires matplotlib)')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    options.sizes = [int(size) for size in options.sizes.split(',')]
+    options.algorithms = options.algorithms.split(',')
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    table = runBenchmark(options.sizes, options.algorithms, options.style, options.seed, options.timeout)
+    if options.output != None: writeTable(table, options.output)
+    if options.plot != None: plotTable(table, options.plot)
@@ -14,7 +14,7 @@
 
 import sys
 import inspect
-import heapq, random
+import heapq, random, collections
 import cStringIO
 
 
@@ -113,6 +113,30 @@ class FixedRandom:
         self.random = random.Random()
         self.random.setstate(fixedState)
 
+class RandomStream(random.Random):
+    """
+    A seeded random number generator that can be split into independent
+    child streams.  A child depends only on its parent's seed and the key it
+    was split with, not on how many numbers have been drawn, so every game
+    and every agent can get its own stream no matter which process (or in
+    which order) the games are played:
+
+    >>> games = RandomStream(1234)
+    >>> ghostStream = games.split(7).split(1)   # game 7, agent 1
+
+    Being a random.Random, a stream can be passed anywhere the random module
+    is used for sampling (see sample, flipCoin, chooseFromDistribution).
+    """
+    def __init__(self, seed=None):
+        if seed == None: seed = random.getrandbits(64)
+        self.streamSeed = seed
+        random.Random.__init__(self, seed)
+
+    def split(self, key):
+        import hashlib
+        digest = hashlib.sha1(repr((self.streamSeed, key))).hexdigest()
+        return RandomStream(int(digest[:16], 16))
+
 """
  Data structures useful for implementing SearchAgents
 """
@@ -221,6 +245,66 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+class BoundedCache:
+    """
+    A dictionary that holds at most maxSize entries (any number if maxSize is
+    None) and counts its hits and misses.  When it is full, adding an entry
+    evicts another one, chosen by the eviction policy:
+
+      'lru'    the least recently used entry
+      'fifo'   the entry that was added first (lookups are a little cheaper)
+    """
+    def __init__(self, maxSize=None, eviction='lru'):
+        if eviction not in ('lru', 'fifo'):
+            raise Exception('Unknown eviction policy ' + str(eviction))
+        self.maxSize = maxSize
+        self.eviction = eviction
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        "Returns the value stored for key, or default on a miss."
+        entries = self.entries
+        if key not in entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        if self.eviction == 'lru':
+            # Move the entry to the recent end
+            value = entries.pop(key)
+            entries[key] = value
+            return value
+        return entries[key]
+
+    def put(self, key, value):
+        entries = self.entries
+        if key in entries:
+            del entries[key]
+        elif self.maxSize != None and len(entries) >= self.maxSize:
+            entries.popitem(last=False)
+            self.evictions += 1
+        entries[key] = value
+
+    def __len__(self):
+        return len(self.entries)
+
+    def getHitRate(self):
+        lookups = self.hits + self.misses
+        if lookups == 0: return 0.0
+        return float(self.hits) / lookups
+
+    def __str__(self):
+        return '%d hits, %d misses (%.1f%% hit rate), %d evictions, %d entries' % \
+               (self.hits, self.misses, 100 * self.getHitRate(), self.evictions, len(self.entries))
+
+def hashableKey(state):
+    "A hashable stand-in for a search state: lists, also inside tuples, become tuples."
+    if type(state) == list or type(state) == tuple:
+        return tuple([hashableKey(item) for item in state])
+    return state
+
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs( xy1[0] - xy2[0] ) + abs( xy1[1] - xy2[1] )
@@ -471,10 +555,10 @@ def normalize(vectorOrCounter):
         if s == 0: return vector
         return [el / s for el in vector]
 
-def nSample(distribution, values, n):
+def nSample(distribution, values, n, rng=random):
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    rand = [random.random() for i in range(n)]
+    rand = [rng.random() for i in range(n)]
     rand.sort()
     samples = []
     samplePos, distPos, cdf = 0,0, distribution[0]
@@ -487,23 +571,23 @@ def nSample(distribution, values, n):
             cdf += distribution[distPos]
     return samples
 
-def sample(distribution, values = None):
+def sample(distribution, values = None, rng=random):
     if type(distribution) == Counter:
         items = sorted(distribution.items())
         distribution = [i[1] for i in items]
         values = [i[0] for i in items]
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    choice = random.random()
+    choice = rng.random()
     i, total= 0, distribution[0]
     while choice > total:
         i += 1
         total += distribution[i]
     return values[i]
 
-def sampleFromCounter(ctr):
+def sampleFromCounter(ctr, rng=random):
     items = sorted(ctr.items())
-    return sample([v for k,v in items], [k for k,v in items])
+    return sample([v for k,v in items], [k for k,v in items], rng)
 
 def getProbability(value, distribution, values):
     """
@@ -516,15 +600,15 @@ def getProbability(value, distribution, values):
             total += prob
     return total
 
-def flipCoin( p ):
-    r = random.random()
+def flipCoin( p, rng=random ):
+    r = rng.random()
     return r < p
 
-def chooseFromDistribution( distribution ):
+def chooseFromDistribution( distribution, rng=random ):
     "Takes either a counter or a list of (prob, key) pairs and samples"
     if type(distribution) == dict or type(distribution) == Counter:
-        return sample(distribution)
-    r = random.random()
+        return sample(distribution, rng=rng)
+    r = rng.random()
     base = 0.0
     for prob, element in distribution:
         base += prob
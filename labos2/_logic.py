@@ -1,5 +1,7 @@
 import util 
 import functools 
+import heapq
+import itertools
 
 class Labels:
     """
@@ -38,6 +40,28 @@ def stateWeight(state):
     return 20*x + y 
 
 
+"""
+Literals are interned as integers: every (label, state) pair is given a
+variable id (1, 2, ...) the first time it is used, and a literal is coded
+as its variable id, negated if the literal is negative. The negation of a
+literal is then simply -code, and clauses are frozensets of codes.
+"""
+_ATOMS = [None]
+_VARIABLES = {}
+_LITERALS = {}
+
+def literalCode(label, state, negative=False):
+    """
+    Return the integer code of a literal.
+    """
+    variable = _VARIABLES.get((label, state))
+    if variable == None:
+        variable = _VARIABLES[(label, state)] = len(_ATOMS)
+        _ATOMS.append((label, state))
+    if negative: return -variable
+    return variable
+
+
 @functools.total_ordering
 class Literal:
     """
@@ -59,24 +83,30 @@ class Literal:
 
         self.negative = negative
         self.label = label 
+        self.code = literalCode(label, state, negative)
 
-    def __key(self):
+    def fromCode(code):
         """
-        Return a unique key representing the literal at a given point
+        Return the (shared) Literal with the given integer code.
         """
-        return (self.x, self.y, self.negative, self.label)
+        literal = _LITERALS.get(code)
+        if literal is None:
+            label, state = _ATOMS[abs(code)]
+            literal = _LITERALS[code] = Literal(label, state, code < 0)
+        return literal
+    fromCode = staticmethod(fromCode)
 
     def __hash__(self):
         """
         Return the hash value - this operator overloads the hash(object) function.
         """
-        return hash(self.__key())
+        return hash(self.code)
 
     def __eq__(first, second):
         """
         Check for equality - this operator overloads '=='
         """
-        return first.__key() == second.__key()
+        return first.code == second.code
 
     def __lt__(self, other):
         """ 
@@ -106,9 +136,9 @@ class Literal:
 
     def negate(self):
         """
-        Return a new Literal containing the negation of the current one
+        Return the Literal containing the negation of the current one
         """
-        return Literal(self.label, self.state, not self.negative)
+        return Literal.fromCode(-self.code)
 
     def isDeadly(self):
         """
@@ -151,19 +181,37 @@ class Clause:
     >>> LiteralC = Literal('c', (0, 0), False)
 
     >>> premise = Clause(set([[LiteralNotB, LiteralC]]))
+
+    A clause keeps the codes of its literals (see literalCode) in the
+    frozenset codes, which is what resolution works with; the set of Literal
+    objects is only a view of them and should not be modified. Clauses
+    derived during resolution are made from codes directly:
+
+    >>> resolvent = Clause(codes=frozenset([-3, 7]))
     """ 
 
-    def __init__(self, literals):
+    def __init__(self, literals=(), codes=None):
         """
         The constructor for a clause. The clause assumes that the data passed 
         is an iterable (e.g., list, set), or a single literal in case of a unit clause. 
         In case of unit clauses, the Literal is wrapped in a list to be safely passed to 
         the set.
         """
-        if not type(literals) == set and not type(literals) == list:
+        if codes != None:
+            self.codes = codes
+            return
+        if not type(literals) == set and not type(literals) == list and not type(literals) == tuple:
             self.literals = set([literals])
         else:
             self.literals = set(literals)
+        self.codes = frozenset([literal.code for literal in self.literals])
+
+    def __getattr__(self, name):
+        # The literals of a clause made from codes are built when first needed
+        if name == 'literals':
+            self.literals = set([Literal.fromCode(code) for code in self.codes])
+            return self.literals
+        raise AttributeError(name)
 
     def isResolveableWith(self, otherClause):
         """
@@ -171,8 +219,9 @@ class Clause:
         if the other clause contains a negation of one of the literals.
         e.g., (~A) and (A v ~B) are examples of two clauses containing opposite literals 
         """
-        for literal in self.literals: 
-            if literal.negate() in otherClause.literals:
+        otherCodes = otherClause.codes
+        for code in self.codes: 
+            if -code in otherCodes:
                 return True 
         return False 
 
@@ -181,8 +230,8 @@ class Clause:
         Check if a clause is a subset of another clause.
         """
         for clause in otherClauses:
-            if self == clause: continue
-            if clause.literals.issubset(self.literals):
+            if self is clause or self.codes == clause.codes: continue
+            if clause.codes.issubset(self.codes):
                 return True
         return False
 
@@ -190,10 +239,10 @@ class Clause:
         """
         Check if a cluase contains a complementary pair of literals
         """
-        for literal1 in self.literals:
-            for literal2 in self.literals:
-                if literal1.state == literal2.state and literal1.negative != literal2.negative:
-                    return True
+        codes = self.codes
+        for code in codes:
+            if -code in codes:
+                return True
         return False
 
     def negateAll(self):
@@ -202,9 +251,8 @@ class Clause:
         as the supporting set for resolution.
         """
         negations = set()
-        for literal in self.literals:
-            clause = Clause(literal.negate())
-            negations.add(clause)
+        for code in self.codes:
+            negations.add(Clause(codes=frozenset([-code])))
         return negations
 
     def __str__(self):
@@ -219,23 +267,172 @@ class Clause:
         """
         return self.__str__()
 
-    def __key(self):
-        """
-        Return a unique key representing the literal at a given point
-        """
-        return tuple(sorted(list(self.literals)))
-
     def __hash__(self):
         """
         Return the hash value - this operator overloads the hash(object) function.
+        A frozenset computes its hash once and caches it.
         """
-        return hash(self.__key())
+        return hash(self.codes)
 
     def __eq__(first, second):
         """
         Check for equality - this operator overloads '=='
         """
-        return first.__key() == second.__key()
+        return first.codes == second.codes
+
+
+class ClauseIndex:
+    """
+    A set of clauses indexed by the literals they contain, for resolution.
+
+    Every clause gets a small integer id the first time it is added and keeps
+    it even if it is removed and added again, so pairs of clauses can be
+    remembered as pairs of ids. occurrences[code] holds the ids of the
+    clauses that contain the literal with that code, so the clauses a clause
+    can be resolved with are found by looking up the negations of its
+    literals instead of trying every clause.
+
+    For subsumption, every clause is also filed in subsumptionKeys under its
+    smallest code (the empty clause under None). A clause can only be
+    subsumed by clauses filed under one of its own codes, and the clauses it
+    subsumes are those in the occurrence lists of all of its codes. units
+    holds the codes of the unit clauses.
+
+    >>> index = ClauseIndex(clauses)
+    >>> for id in index.getResolvable(clause):
+    >>>     print index.clauses[id]
+
+    Changes can be taken back: after startJournal, every add and remove is
+    recorded, and undoJournal reverts them (a KnowledgeBase uses this to
+    resolve on its own index for one query).
+    """
+
+    def __init__(self, clauses=()):
+        self.ids = {}
+        self.clauses = {}
+        self.occurrences = {}
+        self.subsumptionKeys = {}
+        self.units = set()
+        self.nextId = 0
+        self.journal = None
+        for clause in clauses:
+            self.add(clause)
+
+    def getId(self, clause):
+        """
+        Return the id of a clause, giving it a new one if it has never been
+        seen.
+        """
+        id = self.ids.get(clause)
+        if id == None:
+            id = self.ids[clause] = self.nextId
+            self.nextId += 1
+        return id
+
+    def add(self, clause):
+        """
+        Add a clause (if it is not already in the index) and return its id.
+        """
+        id = self.getId(clause)
+        if id not in self.clauses:
+            self.clauses[id] = clause
+            for code in clause.codes:
+                self.occurrences.setdefault(code, set()).add(id)
+            self.subsumptionKeys.setdefault(self._getKey(clause), set()).add(id)
+            if len(clause.codes) == 1:
+                self.units.update(clause.codes)
+            if self.journal != None:
+                self.journal.append((True, clause))
+        return id
+
+    def remove(self, clause):
+        """
+        Remove a clause from the index.
+        """
+        id = self.ids.get(clause)
+        if id == None or id not in self.clauses:
+            raise KeyError(clause)
+        del self.clauses[id]
+        for code in clause.codes:
+            self.occurrences[code].discard(id)
+        self.subsumptionKeys[self._getKey(clause)].discard(id)
+        if len(clause.codes) == 1:
+            self.units.difference_update(clause.codes)
+        if self.journal != None:
+            self.journal.append((False, clause))
+
+    def startJournal(self):
+        """
+        Start recording the changes to the index.
+        """
+        self.journal = []
+        self.journalStart = self.nextId
+
+    def undoJournal(self):
+        """
+        Revert the changes recorded since startJournal and stop recording.
+        Clauses first seen since then also give up their ids, so the ids of
+        a long lived index do not pile up.
+        """
+        journal, self.journal = self.journal, None
+        for added, clause in reversed(journal):
+            if added: self.remove(clause)
+            else: self.add(clause)
+        for added, clause in journal:
+            id = self.ids.get(clause)
+            if id != None and id >= self.journalStart and id not in self.clauses:
+                del self.ids[clause]
+
+    def _getKey(self, clause):
+        if not clause.codes: return None
+        return min(clause.codes)
+
+    def findSubsuming(self, clause):
+        """
+        Return a clause of the index, other than the given one, whose literals
+        are a subset of the given clause's (including an equal clause), or
+        None if there is no such clause.
+        """
+        codes = clause.codes
+        id = self.ids.get(clause)
+        for key in [None] + list(codes):
+            for otherId in self.subsumptionKeys.get(key, ()):
+                if otherId != id and self.clauses[otherId].codes.issubset(codes):
+                    return self.clauses[otherId]
+        return None
+
+    def findSubsumed(self, clause):
+        """
+        Return the clauses of the index whose literals are a proper superset
+        of the given clause's.
+        """
+        codes = clause.codes
+        if not codes:
+            return [other for other in self.clauses.values() if other.codes]
+        lists = sorted([self.occurrences.get(code, set()) for code in codes], key=len)
+        ids = set(lists[0])
+        ids.intersection_update(*lists[1:])
+        return [self.clauses[id] for id in ids if self.clauses[id].codes != codes]
+
+    def getResolvable(self, clause):
+        """
+        Return the ids of the clauses in the index that contain the negation
+        of one of the literals of the given clause.
+        """
+        ids = set()
+        for code in clause.codes:
+            ids.update(self.occurrences.get(-code, ()))
+        return ids
+
+    def __contains__(self, clause):
+        id = self.ids.get(clause)
+        return id != None and id in self.clauses
+
+    def __iter__(self):
+        return iter(self.clauses.values())
+
+    def __len__(self):
+        return len(self.clauses)
 
 
 def resolution(clauses, goal):#resolution(set([premise1, premise2, premise3]), goal)
@@ -250,51 +447,184 @@ def resolution(clauses, goal):#resolution(set([premise1, premise2, premise3]), g
     and simplification strategies. We urge you to go through the slides and 
     carefully design the code before implementing.
     """
-    resolvedPairs = set()   #ubacujemo parove koje smo vratili iz selectClauses
     setOfSupport = goal.negateAll()
 
     "*** YOUR CODE HERE ***"
-    localClauses = clauses.copy()
+    if not setOfSupport:
+        # The empty goal is entailed only by contradictory clauses, so all of
+        # them have to be refuted
+        setOfSupport = set(clauses)
+    localClauses = ClauseIndex(clauses)
     for i in setOfSupport:
         localClauses.add(i)
-    new = set()
-    while True:
-        removeRedundant(localClauses, setOfSupport)
-        for (c1, c2) in selectClauses(localClauses, setOfSupport, resolvedPairs):
-            resolvents = resolvePair(c1, c2)
-            for i in resolvents.copy():
-                if i.isIrrelevant():
-                    resolvents.remove(i)
-                    continue
-                setOfSupport.add(i)
-            if Clause(set()) in resolvents:
+    removeRedundant(localClauses, setOfSupport)
+    return refutation(localClauses, setOfSupport)
+    "*** YOUR CODE HERE ***"
+
+
+"""
+The given clause of refutation is the shortest unprocessed clause, except
+that every PICK_GIVEN_RATIO-th one is the oldest.
+"""
+PICK_GIVEN_RATIO = 5
+
+"""
+What the last call of an engine did, e.g. statistics['resolvents'] (the
+resolvents it derived) and statistics['peakClauses'] (the most clauses it
+held at once). The SAT engine also counts 'conflicts', 'decisions' and
+'learned' clauses.
+"""
+statistics = util.Counter()
+
+"""
+An optional proofTrace.ProofTrace that refutation reports to: detailed
+counters and, if asked for, the clauses it derives and where from, e.g.
+
+>>> trace = setTrace(proofTrace.ProofTrace())
+>>> resolution(clauses, goal)
+>>> trace.writeDot('proof.dot')
+
+With no trace (the default) refutation only checks for one now and then.
+"""
+trace = None
+
+def setTrace(newTrace):
+    """
+    Make refutation report to newTrace (None to stop). Returns newTrace.
+    """
+    global trace
+    trace = newTrace
+    return newTrace
+
+def refutation(clauses, setOfSupport):
+    """
+    clauses - ClauseIndex svih klauzula (sa SoS-om), setOfSupport - set SoS-a
+
+    Refutation resolution with a given clause loop. The clauses of the set of
+    support wait in a queue of unprocessed clauses; all the others are
+    processed. Each step takes the given clause from the queue and resolves
+    it with every processed clause it can be resolved with, after which it
+    is processed itself. Short clauses are taken first, as they lead to the
+    empty clause soonest, and taking the oldest clause every few steps makes
+    sure that long ones get their turn too.
+
+    Every resolvent is simplified before it is queued:
+      forward   literals whose negation is a unit clause are dropped, and
+                tautologies and subsumed resolvents are thrown away
+      backward  the clauses it subsumes are removed, and a unit resolvent
+                shortens the clauses that contain its negation
+
+    Returns True as soon as the empty clause is derived (or if it is among
+    the clauses from the start), and False when the queue runs out. Both clauses and setOfSupport are changed in place.
+    """
+    bySize, byAge = [], []
+    unprocessed = set()
+    ages = itertools.count()
+    statistics.clear()
+    statistics['peakClauses'] = len(clauses)
+    tracer = trace
+    if tracer != None:
+        tracer.start(setOfSupport)
+        counters = tracer.counters
+
+    def enqueue(clause):
+        id = clauses.add(clause)
+        setOfSupport.add(clause)
+        unprocessed.add(id)
+        if len(clauses) > statistics['peakClauses']:
+            statistics['peakClauses'] = len(clauses)
+        age = next(ages)
+        heapq.heappush(bySize, (len(clause.codes), age, id))
+        heapq.heappush(byAge, (age, id))
+
+    def discard(clause):
+        unprocessed.discard(clauses.getId(clause))
+        clauses.remove(clause)
+        setOfSupport.discard(clause)
+
+    def insert(clause, parents):
+        # Returns True if the empty clause turns up
+        pending = [(clause, parents)]
+        while pending:
+            clause, parents = pending.pop()
+            codes = frozenset([code for code in clause.codes if -code not in clauses.units])
+            if len(codes) < len(clause.codes):
+                if tracer != None:
+                    counters['unitDeletions'] += len(clause.codes) - len(codes)
+                    parents = parents + tuple([Clause(codes=frozenset([-code])) for code in clause.codes - codes])
+                clause = Clause(codes=codes)
+            if not codes:
+                if tracer != None: tracer.derive(clause, parents)
                 return True
-            for i in resolvents:
-                new.add(i)
-        removeRedundant(new, setOfSupport)
-        if new.issubset(localClauses):
+            if clause.isIrrelevant():
+                if tracer != None: counters['tautologies'] += 1
+                continue
+            if clause in clauses or clauses.findSubsuming(clause) != None:
+                if tracer != None: counters['forwardSubsumed'] += 1
+                continue
+            subsumed = clauses.findSubsumed(clause)
+            for other in subsumed:
+                discard(other)
+            if tracer != None:
+                counters['backwardSubsumed'] += len(subsumed)
+                tracer.derive(clause, parents)
+            if len(codes) == 1:
+                for code in codes:
+                    for id in list(clauses.occurrences.get(-code, ())):
+                        other = clauses.clauses[id]
+                        discard(other)
+                        if tracer != None: counters['unitDeletions'] += 1
+                        pending.append((Clause(codes=other.codes - frozenset([-code])), (other, clause)))
+            enqueue(clause)
+        return False
+
+    if Clause(codes=frozenset()) in clauses:
+        # The empty clause resolves with nothing, so it is never derived again
+        return True
+    for clause in sorted(setOfSupport, key=lambda clause: len(clause.codes)):
+        enqueue(clause)
+    for step in itertools.count(1):
+        if not unprocessed:
             return False
-        for i in new:
-            localClauses.add(i)
-    "*** YOUR CODE HERE ***"
+        queue = bySize
+        if step % PICK_GIVEN_RATIO == 0: queue = byAge
+        id = heapq.heappop(queue)[-1]
+        while id not in unprocessed:
+            # removed, or taken from the other queue, since it was queued
+            id = heapq.heappop(queue)[-1]
+        unprocessed.discard(id)
+        given = clauses.clauses[id]
+        if tracer != None:
+            counters['givenClauses'] += 1
+            counters['maxSetOfSupport'] = max(counters['maxSetOfSupport'], len(setOfSupport))
+        for otherId in clauses.getResolvable(given):
+            if otherId in unprocessed or otherId not in clauses.clauses:
+                continue
+            other = clauses.clauses[otherId]
+            if tracer != None: counters['pairs'] += 1
+            for resolvent in resolvePair(given, other):
+                statistics['resolvents'] += 1
+                if tracer != None: counters['resolvents'] += 1
+                if insert(resolvent, (given, other)):
+                    return True
 
 
 def removeRedundant(clauses, setOfSupport):
     """
-    Remove redundant clauses (clauses that are subsets of other clauses)
-    from the aforementioned sets.
+    Remove redundant clauses (clauses that are supersets of other clauses)
+    from the ClauseIndex clauses and from the set of support.
     Be careful not to do the operation in-place as you will modify the
     original sets. (why?)
+
+    During resolution, new resolvents are checked against the index as they
+    are derived (forward subsumption) and remove the clauses they subsume
+    (backward subsumption), so this is only needed once, at the start.
     """
     "*** YOUR CODE HERE ***"
-    for clause1 in clauses.copy():
-        if clause1.isRedundant(clauses):
-            if clauses.__contains__(clause1):
-                clauses.remove(clause1)
-    for clause1 in setOfSupport.copy():
-        if clause1.isRedundant(clauses):
-            if clauses.__contains__(clause1):
-                clauses.remove(clause1)
+    for clause1 in list(clauses):
+        if clause1 in clauses and clauses.findSubsuming(clause1) != None:
+            clauses.remove(clause1)
+            setOfSupport.discard(clause1)
     return
     "*** YOUR CODE HERE ***"
 
@@ -310,42 +640,212 @@ def resolvePair(firstClause, secondClause):
     """
     "*** YOUR CODE HERE ***"
     returnSet = set()
-    if not firstClause.isResolveableWith(secondClause):
-        return returnSet
-    for literal1 in firstClause.literals:
-        for literal2 in secondClause.literals:
-            if literal1.label == literal2.label and literal1.state == literal2.state and literal1.negative != literal2.negative:
-                returnClause1 = firstClause.literals - {literal1}
-                returnClause2 = secondClause.literals - {literal2}
-                returnSet.add(Clause(returnClause1.union(returnClause2)))
-                break
+    secondCodes = secondClause.codes
+    for code in firstClause.codes:
+        if -code in secondCodes:
+            returnClause1 = firstClause.codes - frozenset([code])
+            returnClause2 = secondCodes - frozenset([-code])
+            returnSet.add(Clause(codes=returnClause1 | returnClause2))
     return returnSet
     "*** YOUR CODE HERE ***"
 
-def selectClauses(clauses, setOfSupport, resolvedPairs):
+def satResolution(clauses, goal):
+    # type: (set, Clause) -> Bool
     """
-    cluses - set svih kluzula, setOfSupport - set SoS-a,
-    resolvedPairs - set vec rezolviranih tuplova(parova) klauzula
+    Answer the same question as resolution(clauses, goal) - do the clauses
+    entail the goal? - with the CDCL SAT solver from satSolver.py: the goal
+    is entailed exactly when the clauses cannot be satisfied with all the
+    literals of the goal false.
 
-    vrati set tuplova(parova) kroz koji ce iterirati
+    Unlike refutation resolution with a set of support, this is complete
+    even when the clauses themselves are contradictory (they entail anything).
+    """
+    from satSolver import SATSolver
+    solver = SATSolver()
+    for clause in clauses:
+        solver.addClause(clause.codes)
+    try:
+        return not solver.solve([-code for code in goal.codes])
+    finally:
+        statistics.clear()
+        statistics['resolvents'] = solver.resolutions
+        statistics['peakClauses'] = len(solver.clauses) + len(solver.learned)
+        statistics['conflicts'] = solver.conflicts
+        statistics['decisions'] = solver.decisions
+        statistics['learned'] = len(solver.learned)
+
+
+"""
+The entailment engines the agent can choose between, e.g.
+
+> python pacman.py -l lay0 -p PacardAgent -e sat -g WumpusGhost
+"""
+ENGINES = {'resolution': resolution, 'sat': satResolution}
+engine = 'resolution'
+
+def setEngine(name):
+    """
+    Select the engine that entails() uses.
+    """
+    global engine
+    if name not in ENGINES:
+        raise Exception('Unknown entailment engine ' + str(name) + ', use one of ' + ', '.join(sorted(ENGINES)))
+    engine = name
 
-    Select pairs of clauses to resolve.
+def entails(clauses, goal):
     """
-    "*** YOUR CODE HERE ***"
-    returnSet = set()
-    for supportClause in setOfSupport:
+    Check whether the clauses entail the goal with the selected engine.
+    """
+    return ENGINES[engine](clauses, goal)
+
+
+class KnowledgeBase:
+    """
+    A knowledge base that lives as long as the agent, so that a query does
+    not start from nothing: clauses are added one at a time, and what was
+    worked out for earlier queries is kept.
+
+    >>> knowledge = KnowledgeBase(clauses)
+    >>> knowledge.addClause(Clause(Literal(Labels.WUMPUS_STENCH, state)))
+    >>> knowledge.entails(Clause(Literal(Labels.WUMPUS, nextState)))
+    >>> knowledge.entails(goal, [Literal(Labels.WUMPUS, state, True)])
+
+    The second argument of entails is a list of assumptions, literals that
+    are taken as true for that query only.
+
+    With the 'sat' engine the clauses go into one SATSolver, which keeps the
+    clauses it learns from one query to the next. With 'resolution' the
+    clauses are kept in a ClauseIndex, free of subsumed clauses, and a unit
+    clause is resolved with the clauses containing its negation as soon as it
+    is added (a percept shortens the rules about its cell for good). A query
+    resolves on the index itself, journaled so that it is left as it was;
+    what it proves is added as a clause (the goal, or with assumptions the
+    goal or the negation of one of them), so asking again only takes a
+    subsumption check.
+
+    Answers are also remembered, keyed by the goal and the assumptions.
+    version counts the changes to the knowledge base, and since it only
+    grows, a goal it entailed stays entailed; an answer of False is only
+    trusted while the version is the one it was given at, and is checked
+    again after that. Clauses that already follow from the knowledge base
+    (what a query proved, or what the agent concluded from it) are added
+    with entailed=True: they can not turn any answer into True, so they
+    leave the version as it is. getHitRate tells how many queries were
+    answered from memory.
+    """
+    def __init__(self, clauses=(), engineName=None):
+        if engineName == None: engineName = engine
+        if engineName not in ['resolution', 'sat']:
+            raise Exception('A KnowledgeBase cannot use the entailment engine ' + str(engineName))
+        self.engine = engineName
+        self.inconsistent = False
+        self.version = 0
+        self.answers = {}
+        self.hits = 0
+        self.misses = 0
+        self.rechecks = 0
+        if self.engine == 'sat':
+            from satSolver import SATSolver
+            self.solver = SATSolver()
+            self.added = set()
+        else:
+            self.index = ClauseIndex()
+        self.addClauses(clauses)
+
+    def addClauses(self, clauses):
         for clause in clauses:
-            if not clause == supportClause:
-                if (supportClause, clause) not in resolvedPairs:
-                    returnSet.add((supportClause, clause))
-                    resolvedPairs.add((supportClause, clause))
-        for clause in setOfSupport:
-            if not clause == supportClause:
-                if (supportClause, clause) not in resolvedPairs:
-                    returnSet.add((supportClause, clause))
-                    resolvedPairs.add((supportClause, clause))
-    return returnSet
-    "*** YOUR CODE HERE ***"
+            self.addClause(clause)
+
+    def addClause(self, clause, entailed=False):
+        """
+        Add a clause to the knowledge base; entailed=True if it follows from
+        the knowledge base already.
+        """
+        if self.inconsistent: return
+        if self.engine == 'sat':
+            if clause in self.added: return
+            self.added.add(clause)
+            if not entailed: self.version += 1
+            if not self.solver.addClause(clause.codes):
+                self.inconsistent = True
+            return
+
+        index = self.index
+        pending = [clause]
+        while pending:
+            clause = pending.pop()
+            if clause.isIrrelevant() or clause in index or index.findSubsuming(clause) != None:
+                continue
+            if not entailed: self.version += 1
+            if not clause.codes:
+                self.inconsistent = True
+                return
+            for other in index.findSubsumed(clause):
+                index.remove(other)
+            index.add(clause)
+            if len(clause.codes) == 1:
+                # Unit resolution: each resolvent subsumes the clause it came from
+                for code in clause.codes:
+                    for id in list(index.occurrences.get(-code, ())):
+                        pending.append(Clause(codes=index.clauses[id].codes - frozenset([-code])))
+
+    def entails(self, goal, assumptions=()):
+        """
+        Check whether the knowledge base, with the assumptions (literals)
+        true, entails the goal clause.
+        """
+        assumed = frozenset([literal.code for literal in assumptions])
+        key = (goal.codes, assumed)
+        if key in self.answers:
+            answer, version = self.answers[key]
+            if answer or version == self.version:
+                self.hits += 1
+                return answer
+            self.rechecks += 1
+        self.misses += 1
+        version = self.version
+        answer = self._entails(goal, assumed)
+        self.answers[key] = (answer, version)
+        return answer
+
+    def _entails(self, goal, assumed):
+        if self.inconsistent: return True
+        if self.engine == 'sat':
+            return not self.solver.solve(list(assumed) + [-code for code in goal.codes if -code not in assumed])
+
+        index = self.index
+        if assumed & goal.codes: return True
+        # What the query would prove: the goal, unless an assumption is false
+        conclusion = Clause(codes=goal.codes | frozenset([-code for code in assumed]))
+        if conclusion.isIrrelevant() or conclusion in index or index.findSubsuming(conclusion) != None:
+            return True
+        setOfSupport = conclusion.negateAll()
+        if not setOfSupport:
+            # As in resolution(), only contradictory clauses entail the empty goal
+            setOfSupport = set(index)
+        index.startJournal()
+        try:
+            for clause in setOfSupport:
+                index.add(clause)
+            for clause in setOfSupport:
+                if clause in index:
+                    for other in index.findSubsumed(clause):
+                        index.remove(other)
+            proved = refutation(index, setOfSupport)
+        finally:
+            index.undoJournal()
+        if proved:
+            self.addClause(conclusion, entailed=True)
+        return proved
+
+    def getHitRate(self):
+        queries = self.hits + self.misses
+        if queries == 0: return 0.0
+        return float(self.hits) / queries
+
+    def __str__(self):
+        return 'version %d, %d hits, %d misses (%.1f%% hit rate), %d answers rechecked' % \
+               (self.version, self.hits, self.misses, 100 * self.getHitRate(), self.rechecks)
 
 
 def testResolution():
@@ -6,6 +6,7 @@ Pacman agents (in searchAgents.py).
 
 import util
 from logic import *
+from frontierInference import FrontierInference, reachableCells
 
 class SearchProblem:
     """
@@ -143,91 +144,98 @@ def logicBasedSearch(problem):
     currentState = startState
     clauseSet = set()
     fillKnowledgeBank(clauseSet, problem)
+    knowledge = KnowledgeBase(clauseSet)
+    inference = FrontierInference(reachableCells(problem))
     while True:
         visitedStates.append(currentState)
         print "Visiting:", currentState
         #clauseSet.add(Clause([Literal(Labels.WUMPUS, currentState), Literal(Labels.POISON, currentState), Literal(Labels.SAFE, currentState)]))
         if problem.isGoalState(currentState):
             print "Game over: Teleported home!"
-            problem.reconstructPath(visitedStates)
+            print "Knowledge base:", knowledge
+            return problem.reconstructPath(visitedStates)
 
 
         if problem.isPoisonCapsuleClose(currentState):
             print "Sensed: b", currentState
             # literal = Literal(Labels.POISON_FUMES, currentState, True)
             # fillSetForPositive(clauseSet, Labels.POISON, problem.getSuccessors(currentState), literal)
-            clauseSet.add(Clause(Literal(Labels.POISON_FUMES, currentState)))
+            knowledge.addClause(Clause(Literal(Labels.POISON_FUMES, currentState)))
         else:
             print "Sensed: ~b", currentState
             # positivePoisonFumes = Literal(Labels.POISON_FUMES, currentState)
             # fillSetForNegative(clauseSet, Labels.POISON, problem.getSuccessors(currentState), positivePoisonFumes)
-            clauseSet.add(Clause(Literal(Labels.POISON_FUMES, currentState, True)))
+            knowledge.addClause(Clause(Literal(Labels.POISON_FUMES, currentState, True)))
 
         if problem.isWumpusClose(currentState):
             print "Sensed: s", currentState
             #clauseSet.add(Clause(Literal(Labels.WUMPUS_STENCH, currentState, True)))
             # literal = Literal(Labels.WUMPUS_STENCH, currentState, True)
             # fillSetForPositive(clauseSet, Labels.WUMPUS, problem.getSuccessors(currentState), literal)
-            clauseSet.add(Clause(Literal(Labels.WUMPUS_STENCH, currentState)))
+            knowledge.addClause(Clause(Literal(Labels.WUMPUS_STENCH, currentState)))
         else:
             print "Sensed: ~s", currentState
             # positiveWumpusStench = Literal(Labels.WUMPUS_STENCH, currentState)
             # fillSetForNegative(clauseSet, Labels.WUMPUS, problem.getSuccessors(currentState), positiveWumpusStench)
-            clauseSet.add(Clause(Literal(Labels.WUMPUS_STENCH, currentState, True)))
+            knowledge.addClause(Clause(Literal(Labels.WUMPUS_STENCH, currentState, True)))
 
         if problem.isTeleporterClose(currentState):
             print "Sensed: g", currentState
             #clauseSet.add(Clause(Literal(Labels.TELEPORTER_GLOW, currentState, True)))
             # literal = Literal(Labels.TELEPORTER_GLOW, currentState, True)
             # fillSetForPositive(clauseSet, Labels.TELEPORTER, problem.getSuccessors(currentState), literal)
-            clauseSet.add(Clause(Literal(Labels.TELEPORTER_GLOW, currentState)))
+            knowledge.addClause(Clause(Literal(Labels.TELEPORTER_GLOW, currentState)))
         else:
             print "Sensed: ~g", currentState
             # positiveTeleporterGlow = Literal(Labels.TELEPORTER_GLOW, currentState)
             # fillSetForNegative(clauseSet, Labels.TELEPORTER, problem.getSuccessors(currentState), positiveTeleporterGlow)
-            clauseSet.add(Clause(Literal(Labels.TELEPORTER_GLOW, currentState, True)))
+            knowledge.addClause(Clause(Literal(Labels.TELEPORTER_GLOW, currentState, True)))
+
+        inference.addPercepts(currentState, {Labels.POISON_FUMES: problem.isPoisonCapsuleClose(currentState),
+                                             Labels.WUMPUS_STENCH: problem.isWumpusClose(currentState),
+                                             Labels.TELEPORTER_GLOW: problem.isTeleporterClose(currentState)})
 
         for state in problem.getSuccessors(currentState):
             #print clauseSet
 
             # clauseSet.add(Clause([Literal(Labels.WUMPUS, state[0]), Literal(Labels.POISON, state[0]),
             #                        Literal(Labels.SAFE, state[0])]))
-            if resolution(clauseSet, Clause(Literal(Labels.WUMPUS, state[0]))):
+            if knowledge.entails(Clause(Literal(Labels.WUMPUS, state[0]))):
                 print "Concluded: w", state[0]
-                clauseSet.add(Clause(Literal(Labels.WUMPUS, state[0])))
+                knowledge.addClause(Clause(Literal(Labels.WUMPUS, state[0])), entailed=True)
                 w = True
-            if resolution(clauseSet, Clause(Literal(Labels.WUMPUS, state[0], True))):
+            if knowledge.entails(Clause(Literal(Labels.WUMPUS, state[0], True))):
                 print "Concluded: ~w", state[0]
-                clauseSet.add(Clause(Literal(Labels.WUMPUS, state[0], True)))
+                knowledge.addClause(Clause(Literal(Labels.WUMPUS, state[0], True)), entailed=True)
                 w = False
 
-            if resolution(clauseSet, Clause(Literal(Labels.TELEPORTER, state[0]))):
+            if knowledge.entails(Clause(Literal(Labels.TELEPORTER, state[0]))):
                 print "Concluded: t", state[0]
-                clauseSet.add(Clause(Literal(Labels.TELEPORTER, state[0])))
-                currentState = state
+                knowledge.addClause(Clause(Literal(Labels.TELEPORTER, state[0])), entailed=True)
+                currentState = state[0]
                 continue
-            if resolution(clauseSet, Clause(Literal(Labels.TELEPORTER, state[0], True))):
+            if knowledge.entails(Clause(Literal(Labels.TELEPORTER, state[0], True))):
                 print "Concluded: ~t", state[0]
-                clauseSet.add(Clause(Literal(Labels.TELEPORTER, state[0], True)))
+                knowledge.addClause(Clause(Literal(Labels.TELEPORTER, state[0], True)), entailed=True)
 
-            if resolution(clauseSet, Clause(Literal(Labels.POISON, state[0]))):
+            if knowledge.entails(Clause(Literal(Labels.POISON, state[0]))):
                 print "Concluded: p", state[0]
-                clauseSet.add(Clause(Literal(Labels.POISON, state[0])))
+                knowledge.addClause(Clause(Literal(Labels.POISON, state[0])), entailed=True)
                 p = True
-            if resolution(clauseSet, Clause(Literal(Labels.POISON, state[0], True))):
+            if knowledge.entails(Clause(Literal(Labels.POISON, state[0], True))):
                 print "Concluded: ~p", state[0]
-                clauseSet.add(Clause(Literal(Labels.POISON, state[0], True)))
+                knowledge.addClause(Clause(Literal(Labels.POISON, state[0], True)), entailed=True)
                 p = False
 
             #if not (p or w):
-            if resolution(clauseSet, Clause(Literal(Labels.SAFE, state[0]))):
+            if knowledge.entails(Clause(Literal(Labels.SAFE, state[0]))):
                 print "Concluded: o", state[0]
-                clauseSet.add(Clause(Literal(Labels.SAFE, state[0])))
+                knowledge.addClause(Clause(Literal(Labels.SAFE, state[0])), entailed=True)
                 safeStates.add(state)
             #else:
-            if resolution(clauseSet, Clause(Literal(Labels.SAFE, state[0], True))):
+            if knowledge.entails(Clause(Literal(Labels.SAFE, state[0], True))):
                 print "Concluded: ~o", state[0]
-                clauseSet.add(Clause(Literal(Labels.SAFE, state[0], True)))
+                knowledge.addClause(Clause(Literal(Labels.SAFE, state[0], True)), entailed=True)
 
             minimumStateWeight = 999999
             minimumState = 0
@@ -242,7 +250,14 @@ def logicBasedSearch(problem):
                 currentState = minimumState[0]
                 continue
 
-        util.pause()
+        if currentState in visitedStates:
+            # Nothing new is provably safe: step into the frontier cell least likely to be deadly
+            currentState = inference.leastRiskyCell()
+            if currentState == None:
+                return problem.reconstructPath(visitedStates)
+            probabilities = inference.getProbabilities()[currentState]
+            print "Guessing:", currentState, "w %.2f p %.2f t %.2f" % (probabilities[Labels.WUMPUS],
+                  probabilities[Labels.POISON], probabilities[Labels.TELEPORTER])
     "*** YOUR CODE HERE ***"
 
 
@@ -0,0 +1,116 @@
+# cnfBenchmark.py
+# ---------------
+"""
+Runs entailment engines of logic.py (see logic.ENGINES) over a directory of
+DIMACS CNF files, in a pool of worker processes. Every file is a question
+of whether its clauses are contradictory: an engine is asked whether they
+entail the empty clause, so UNSAT means that they do.
+
+For every file and engine the benchmark records
+
+  seconds      time spent in the engine
+  answer       SAT, UNSAT or t/o if the time ran out
+  resolvents   resolvents derived (for the SAT engine, the resolution steps
+               of its conflict analysis)
+  peak         the most clauses the engine held at once
+
+see logic.statistics. Results can also be written to a CSV file, to follow
+the engines' performance from one version to the next.
+
+> python dimacs.py test cnf
+> python cnfBenchmark.py -d cnf -e resolution,sat -w 4 -o results.csv
+"""
+
+import os, sys, time
+import util
+import logic
+import dimacs
+
+def runInstance(task):
+    "Runs one engine on one file; the work of a worker process."
+    path, engine, timeout = task
+    clauses = dimacs.readDimacs(path)
+    start = time.time()
+    try:
+        answer = util.TimeoutFunction(logic.ENGINES[engine], timeout)(clauses, logic.Clause([]))
+        answer = {True: 'UNSAT', False: 'SAT'}[answer]
+    except util.TimeoutFunctionException:
+        answer = 't/o'
+    seconds = time.time() - start
+    return {'file': os.path.basename(path), 'engine': engine, 'clauses': len(clauses),
+            'seconds': seconds, 'answer': answer,
+            'resolvents': logic.statistics['resolvents'], 'peak': logic.statistics['peakClauses']}
+
+def runBenchmark(directory, engines, workers=1, timeout=60):
+    """
+    Runs every engine on every .cnf file of a directory and returns the
+    results in file order.
+    """
+    paths = sorted([os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.cnf')])
+    tasks = [(path, engine, timeout) for path in paths for engine in engines]
+    if workers > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = pool.map(runInstance, tasks, 1)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        results = map(runInstance, tasks)
+    return results
+
+COLUMNS = ['file', 'engine', 'clauses', 'seconds', 'answer', 'resolvents', 'peak']
+
+def printResults(results):
+    print '%-16s %-12s %8s %10s %6s %11s %8s' % tuple(COLUMNS)
+    for result in results:
+        print '%-16s %-12s %8d %9.3fs %6s %11d %8d' % tuple([result[column] for column in COLUMNS])
+    answers = {}
+    for result in results:
+        if result['answer'] != 't/o':
+            answers.setdefault(result['file'], set()).add(result['answer'])
+    disagreements = [name for name in sorted(answers) if len(answers[name]) > 1]
+    if disagreements:
+        print 'The engines disagree on ' + ', '.join(disagreements)
+
+def writeResults(path, results):
+    import csv
+    f = open(path, 'wb')
+    try:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for result in results:
+            writer.writerow([result[column] for column in COLUMNS])
+    finally:
+        f.close()
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE:      python cnfBenchmark.py <options>')
+    parser.add_option('-d', '--directory', dest='directory', default='cnf',
+                      help='Directory of DIMACS .cnf files [Default: %default]')
+    parser.add_option('-e', '--engines', dest='engines', default='resolution,sat',
+                      help='Comma separated engines from logic.ENGINES [Default: %default]')
+    parser.add_option('-w', '--workers', dest='workers', type='int', default=1,
+                      help='Worker processes [Default: %default]')
+    parser.add_option('-t', '--timeout', dest='timeout', type='int', default=60,
+                      help='Seconds before an instance is given up [Default: %default]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Also write the results to this CSV file')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    options.engines = options.engines.split(',')
+    for engine in options.engines:
+        if engine not in logic.ENGINES: raise Exception('Unknown entailment engine ' + engine)
+    if not os.path.isdir(options.directory):
+        raise Exception('No such directory ' + options.directory)
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    results = runBenchmark(options.directory, options.engines, options.workers, options.timeout)
+    printResults(results)
+    if options.output != None: writeResults(options.output, results)
@@ -0,0 +1,132 @@
+# dimacs.py
+# ---------
+"""
+Reading and writing clauses in the DIMACS CNF format, the format of the
+standard SAT benchmark families (SATLIB, the SAT competitions):
+
+  c a comment
+  p cnf 3 2
+  1 -2 0
+  2 3 -1 0
+
+Variables are numbered from 1 and a clause is a list of (possibly negated)
+variable numbers ended by 0. Clauses read from a file are Clause objects of
+logic.py; variable n becomes the literal Literal('v<n>', (0, 0)), unless the
+file names its variables with comments of the form
+
+  c var 3 w 2 1
+
+(variable 3 is Literal('w', (2, 1))), which writeDimacs adds so that a file
+it writes reads back into the same literals.
+
+> python dimacs.py test cnf
+
+converts the tests of logicTests.py into DIMACS files; as a test asks
+whether the premises entail the goal, a file holds the premises together
+with the negation of the goal, which can not be satisfied exactly when the
+answer of the test is True.
+"""
+
+import os, sys
+from logic import Literal, Clause
+
+def readDimacs(path):
+    """
+    Returns the list of clauses in a DIMACS CNF file.
+    """
+    names = {}
+    clauses = []
+    literals = []
+    f = open(path)
+    try:
+        for line in f:
+            fields = line.split()
+            if not fields: continue
+            if fields[0] == '%':
+                # The end of a SATLIB file, which is followed by a stray 0
+                break
+            if fields[0] == 'c':
+                if len(fields) == 6 and fields[1] == 'var':
+                    names[int(fields[2])] = (fields[3], (int(fields[4]), int(fields[5])))
+                continue
+            if fields[0] == 'p': continue
+            for field in fields:
+                number = int(field)
+                if number == 0:
+                    clauses.append(literals)
+                    literals = []
+                else:
+                    literals.append(number)
+    finally:
+        f.close()
+    if literals: clauses.append(literals)
+
+    result = []
+    for numbers in clauses:
+        clause = set()
+        for number in numbers:
+            label, state = names.get(abs(number), ('v%d' % abs(number), (0, 0)))
+            clause.add(Literal(label, state, number < 0))
+        result.append(Clause(clause))
+    return result
+
+def writeDimacs(path, clauses, comment=None):
+    """
+    Writes clauses to a DIMACS CNF file, with comments that name the
+    variables after their literals.
+    """
+    atoms = sorted(set([(literal.label, literal.state) for clause in clauses for literal in clause.literals]))
+    numbers = dict([(atom, i + 1) for i, atom in enumerate(atoms)])
+    f = open(path, 'w')
+    try:
+        if comment != None:
+            for line in comment.split('\n'):
+                f.write('c %s\n' % line)
+        for (label, (x, y)), number in sorted(numbers.items(), key=lambda item: item[1]):
+            f.write('c var %d %s %d %d\n' % (number, label, x, y))
+        f.write('p cnf %d %d\n' % (len(atoms), len(clauses)))
+        for clause in clauses:
+            codes = []
+            for literal in sorted(clause.literals, key=lambda literal: numbers[(literal.label, literal.state)]):
+                number = numbers[(literal.label, literal.state)]
+                if literal.negative: number = -number
+                codes.append(str(number))
+            f.write(' '.join(codes + ['0']) + '\n')
+    finally:
+        f.close()
+
+def readTest(path):
+    """
+    Reads a test of logicTests.py: the expected answer, the premises and the
+    goal.
+    """
+    f = open(path)
+    try:
+        solution = f.readline().strip()
+        clauses = []
+        for line in f:
+            if not line.split(): continue
+            literals = set()
+            for name in line.split():
+                if name.startswith('-'): literals.add(Literal(name[1:], (0, 0), True))
+                else: literals.add(Literal(name, (0, 0), False))
+            clauses.append(Clause(literals))
+    finally:
+        f.close()
+    return solution, clauses[:-1], clauses[-1]
+
+def convertTests(testDirectory, cnfDirectory):
+    "Writes every test of testDirectory as a DIMACS file into cnfDirectory."
+    if not os.path.isdir(cnfDirectory): os.makedirs(cnfDirectory)
+    for name in sorted(os.listdir(testDirectory)):
+        solution, premises, goal = readTest(os.path.join(testDirectory, name))
+        clauses = premises + sorted(goal.negateAll(), key=str)
+        status = {'True': 'UNSAT', 'False': 'SAT'}[solution]
+        writeDimacs(os.path.join(cnfDirectory, os.path.splitext(name)[0] + '.cnf'), clauses,
+                    'converted from %s, expected %s' % (name, status))
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print 'USAGE:      python dimacs.py <test directory> <cnf directory>'
+        sys.exit(1)
+    convertTests(sys.argv[1], sys.argv[2])
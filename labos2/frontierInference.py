@@ -0,0 +1,200 @@
+# frontierInference.py
+# --------------------
+"""
+Probabilistic inference for the Wumpus world, for when logic alone leaves
+the agent with no cell that is provably safe.
+
+The agent has visited some cells and sensed the stench (s), fumes (b) and
+glow (g) at each of them. The frontier is the cells next to visited ones
+that have not been visited themselves. A percept only depends on the cells
+next to the cell it was sensed at, and none of the visited cells holds
+anything (the agent is alive), so it constrains only frontier cells; all
+other unvisited cells can be summed out. For every frontier cell the exact
+probability of the Wumpus, poison and the teleporter is computed:
+
+  Wumpus, teleporter  there is exactly one, equally likely to be in any
+                      unvisited cell at first; it is in one of the cells
+                      that agree with every percept
+  poison              any number of capsules, every cell holding one with
+                      probability POISON_PRIOR; the fumes sensed at a cell
+                      require poison in at least one of its frontier
+                      neighbors, and no fumes rule them all out
+
+For poison the probabilities come from weighted model counting over the
+frontier cells alone. The frontier falls apart into components (cells that
+share no percept are independent), which are counted separately, and the
+count of every component is memoized, so a component that a new percept
+does not touch is never counted again.
+
+>>> inference = FrontierInference(reachableCells(problem))
+>>> inference.addPercepts(state, {Labels.WUMPUS_STENCH: True, Labels.POISON_FUMES: False,
+...                               Labels.TELEPORTER_GLOW: False})
+>>> inference.getProbabilities()[cell][Labels.WUMPUS]
+>>> inference.leastRiskyCell()
+"""
+
+from logic import Labels, stateWeight
+
+POISON_PRIOR = 0.1
+
+"The percept that gives away each kind of object"
+INDICATORS = {Labels.WUMPUS: Labels.WUMPUS_STENCH,
+              Labels.POISON: Labels.POISON_FUMES,
+              Labels.TELEPORTER: Labels.TELEPORTER_GLOW}
+
+def reachableCells(problem):
+    "The cells that can be reached from the start of a search problem."
+    start = problem.getStartState()
+    cells, frontier = set([start]), [start]
+    while frontier:
+        state = frontier.pop()
+        for nextState, action, cost in problem.getSuccessors(state):
+            if nextState not in cells:
+                cells.add(nextState)
+                frontier.append(nextState)
+    return cells
+
+def _components(clauses):
+    "Splits a set of clauses into sets that share no cells."
+    byCell = {}
+    for clause in clauses:
+        for cell in clause:
+            byCell.setdefault(cell, []).append(clause)
+    components, seen = [], set()
+    for clause in clauses:
+        if clause in seen: continue
+        component, stack = set([clause]), [clause]
+        seen.add(clause)
+        while stack:
+            for cell in stack.pop():
+                for other in byCell[cell]:
+                    if other not in seen:
+                        seen.add(other)
+                        component.add(other)
+                        stack.append(other)
+        components.append(frozenset(component))
+    return components
+
+class FrontierInference:
+    def __init__(self, cells, poisonPrior=POISON_PRIOR):
+        self.cells = set(cells)
+        self.poisonPrior = poisonPrior
+        self.percepts = {}
+        self.counts = {}
+
+    def addPercepts(self, cell, sensed):
+        """
+        Records what was sensed at a visited cell: sensed maps each of the
+        indicator labels (Labels.INDICATORS) to True or False.
+        """
+        self.percepts[cell] = dict(sensed)
+
+    def getNeighbors(self, cell):
+        x, y = cell
+        return [neighbor for neighbor in [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)] if neighbor in self.cells]
+
+    def getFrontier(self):
+        "The unvisited cells next to visited ones."
+        frontier = set()
+        for cell in self.percepts:
+            for neighbor in self.getNeighbors(cell):
+                if neighbor not in self.percepts:
+                    frontier.add(neighbor)
+        return frontier
+
+    def _uniqueProbabilities(self, indicator, frontier):
+        # The object is next to every cell where it was sensed and no other visited cell
+        candidates = None
+        ruledOut = set(self.percepts)
+        for cell, sensed in self.percepts.items():
+            neighbors = set(self.getNeighbors(cell))
+            if sensed[indicator]:
+                if candidates == None: candidates = neighbors
+                else: candidates = candidates & neighbors
+            else:
+                ruledOut.update(neighbors)
+        if candidates == None: candidates = self.cells
+        candidates = candidates - ruledOut
+        probabilities = {}
+        for cell in frontier:
+            if cell in candidates: probabilities[cell] = 1.0 / len(candidates)
+            else: probabilities[cell] = 0.0
+        return probabilities
+
+    def _count(self, clauses):
+        """
+        The probability that every clause (a frozenset of cells) has poison in
+        at least one of its cells.
+        """
+        if not clauses: return 1.0
+        if clauses in self.counts: return self.counts[clauses]
+        components = _components(clauses)
+        if len(components) > 1:
+            weight = 1.0
+            for component in components:
+                weight *= self._count(component)
+        else:
+            occurrences = {}
+            for clause in clauses:
+                for cell in clause:
+                    occurrences[cell] = occurrences.get(cell, 0) + 1
+            cell = max(occurrences, key=lambda cell: (occurrences[cell], cell))
+            # Poison in the cell satisfies the clauses it is in; no poison drops it from them
+            weight = self.poisonPrior * self._count(frozenset([clause for clause in clauses if cell not in clause]))
+            without = frozenset([clause - frozenset([cell]) for clause in clauses])
+            if frozenset() not in without:
+                weight += (1 - self.poisonPrior) * self._count(without)
+        self.counts[clauses] = weight
+        return weight
+
+    def _poisonProbabilities(self, frontier):
+        indicator = INDICATORS[Labels.POISON]
+        ruledOut = set()
+        for cell, sensed in self.percepts.items():
+            if not sensed[indicator]: ruledOut.update(self.getNeighbors(cell))
+        clauses = set()
+        for cell, sensed in self.percepts.items():
+            if sensed[indicator]:
+                clauses.add(frozenset([neighbor for neighbor in self.getNeighbors(cell)
+                                       if neighbor in frontier and neighbor not in ruledOut]))
+
+        probabilities = {}
+        for cell in frontier:
+            if cell in ruledOut: probabilities[cell] = 0.0
+            else: probabilities[cell] = self.poisonPrior
+        if frozenset() in clauses:
+            # The percepts contradict the model; the prior is all there is
+            return probabilities
+        for component in _components(clauses):
+            total = self._count(component)
+            for cell in set().union(*component):
+                given = frozenset([clause for clause in component if cell not in clause])
+                probabilities[cell] = self.poisonPrior * self._count(given) / total
+        return probabilities
+
+    def getProbabilities(self):
+        """
+        Maps every frontier cell to the probabilities of Labels.WUMPUS,
+        Labels.POISON and Labels.TELEPORTER being there.
+        """
+        frontier = self.getFrontier()
+        wumpus = self._uniqueProbabilities(INDICATORS[Labels.WUMPUS], frontier)
+        teleporter = self._uniqueProbabilities(INDICATORS[Labels.TELEPORTER], frontier)
+        poison = self._poisonProbabilities(frontier)
+        return dict([(cell, {Labels.WUMPUS: wumpus[cell], Labels.POISON: poison[cell],
+                             Labels.TELEPORTER: teleporter[cell]}) for cell in frontier])
+
+    def getRisk(self, probabilities):
+        "The probability of death in a cell, from its entry of getProbabilities."
+        return 1 - (1 - probabilities[Labels.WUMPUS]) * (1 - probabilities[Labels.POISON])
+
+    def leastRiskyCell(self):
+        """
+        The frontier cell least likely to be deadly; of equally risky cells the
+        one most likely to hold the teleporter, then the one with the smallest
+        stateWeight. None if the frontier is empty.
+        """
+        probabilities = self.getProbabilities()
+        if not probabilities: return None
+        return min(probabilities, key=lambda cell: (self.getRisk(probabilities[cell]),
+                                                    -probabilities[cell][Labels.TELEPORTER], stateWeight(cell)))
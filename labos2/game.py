@@ -165,6 +165,12 @@ class Grid:
     via grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
     y vertical and the origin (0,0) in the bottom left corner.
 
+    Tables derived from the cells, like the Adjacency of Actions.getAdjacency,
+    are cached on the grid itself.  Writing grid[x][y] does not drop them, so
+    whoever changes the cells of a grid must call invalidateCaches afterwards
+    (copies start without caches; a shallowCopy shares the cells, so both
+    grids have to be told).
+
     The __str__ method constructs an output that is oriented like a pacman board.
     """
     def __init__(self, width, height, initialValue=False, bitRepresentation=None):
@@ -216,6 +222,10 @@ class Grid:
         g.data = self.data
         return g
 
+    def invalidateCaches(self):
+        "Drops the tables cached on the grid, which no longer match changed cells."
+        self.adjacency = None
+
     def count(self, item =True ):
         return sum([x.count(item) for x in self.data])
 
@@ -330,7 +340,6 @@ class Actions:
     directionToVector = staticmethod(directionToVector)
 
     def getPossibleActions(config, walls):
-        possible = []
         x, y = config.pos
         x_int, y_int = int(x + 0.5), int(y + 0.5)
 
@@ -338,36 +347,78 @@ class Actions:
         if (abs(x - x_int) + abs(y - y_int)  > Actions.TOLERANCE):
             return [config.getDirection()]
 
-        for dir, vec in Actions._directionsAsList:
-            dx, dy = vec
-            next_y = y_int + dy
-            next_x = x_int + dx
-            if not walls[next_x][next_y]: possible.append(dir)
-
-        return possible
+        return list(Actions.getAdjacency(walls).actions[x_int][y_int])
 
     getPossibleActions = staticmethod(getPossibleActions)
 
     def getLegalNeighbors(position, walls):
         x,y = position
         x_int, y_int = int(x + 0.5), int(y + 0.5)
-        neighbors = []
-        for dir, vec in Actions._directionsAsList:
-            dx, dy = vec
-            next_x = x_int + dx
-            if next_x < 0 or next_x == walls.width: continue
-            next_y = y_int + dy
-            if next_y < 0 or next_y == walls.height: continue
-            if not walls[next_x][next_y]: neighbors.append((next_x, next_y))
-        return neighbors
+        return list(Actions.getAdjacency(walls).neighbors[x_int][y_int])
     getLegalNeighbors = staticmethod(getLegalNeighbors)
 
+    def getAdjacency(walls):
+        """
+        Returns the Adjacency of a walls grid, building it the first time it
+        is asked for.  The walls of a layout never change, so it is kept on
+        the grid itself until Grid.invalidateCaches drops it.
+        """
+        adjacency = getattr(walls, 'adjacency', None)
+        if adjacency == None:
+            adjacency = walls.adjacency = Adjacency(walls)
+        return adjacency
+    getAdjacency = staticmethod(getAdjacency)
+
     def getSuccessor(position, action):
         dx, dy = Actions.directionToVector(action)
         x, y = position
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+class Adjacency:
+    """
+    The moves possible from every cell of a walls grid, computed once so that
+    successor functions do not have to add direction vectors and test walls
+    on every call.  Cell (x, y) has index x * height + y.
+
+      moves[index]       (neighborIndex, action) pairs for North, South, East,
+                         West, in that order (the order successor functions use)
+      successors[pos]    the same moves as (neighborPosition, action) pairs,
+                         keyed by the position of every open cell
+      actions[x][y]      the actions of getPossibleActions, Stop included
+      neighbors[x][y]    the positions of getLegalNeighbors
+
+    Moves that leave the grid are never legal.
+    """
+    def __init__(self, walls):
+        self.width, self.height = width, height = walls.width, walls.height
+        self.positions = [(x, y) for x in range(width) for y in range(height)]
+        self.moves = []
+        self.successors = {}
+        self.actions = [[None] * height for x in range(width)]
+        self.neighbors = [[None] * height for x in range(width)]
+
+        def isOpen(x, y):
+            return 0 <= x < width and 0 <= y < height and not walls[x][y]
+
+        for x, y in self.positions:
+            moves = []
+            for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                dx, dy = Actions._directions[action]
+                if isOpen(x + dx, y + dy):
+                    moves.append(((x + dx) * height + y + dy, action))
+            self.moves.append(tuple(moves))
+            if not walls[x][y]:
+                self.successors[(x, y)] = tuple([(self.positions[i], action) for i, action in moves])
+
+            legal = [(dir, (x + dx, y + dy)) for dir, (dx, dy) in Actions._directionsAsList if isOpen(x + dx, y + dy)]
+            self.actions[x][y] = tuple([dir for dir, position in legal])
+            self.neighbors[x][y] = tuple([position for dir, position in legal])
+
+    def getIndex(self, position):
+        x, y = position
+        return x * self.height + y
+
 class GameStateData:
     """
 
@@ -0,0 +1,162 @@
+# logicBenchmark.py
+# -----------------
+"""
+Compares the entailment engines of logic.py (see logic.ENGINES) side by side
+on the Wumpus layouts.
+
+For every layout the background knowledge base is built as the agent builds
+it (pacard.fillKnowledgeBank). Then the cells reachable from Pacman's start
+are visited in breadth first order, ignoring danger; at every visited cell
+its percepts (b, s, g) are added, and every engine is asked the agent's eight
+questions (w, ~w, t, ~t, p, ~p, o, ~o) about each neighboring cell. For each
+engine the total time is reported, along with the number of questions on
+which the engines disagree and the number that ran out of time.
+
+With -i every engine answers through one logic.KnowledgeBase per layout,
+which the percepts are added to as the cells are visited, instead of being
+handed the whole set of clauses for every question. Neighboring cells share
+neighbors, so some questions come again; the share of them answered from
+the knowledge base's memory is reported as the hit rate.
+
+> python logicBenchmark.py -e resolution,sat -s 3
+> python logicBenchmark.py -e resolution,sat -s 10 -i
+"""
+
+import sys, time
+import util
+import layout
+import logic
+import pacard
+from logic import Literal, Clause, Labels
+
+QUESTIONS = [(label, negative) for label in [Labels.WUMPUS, Labels.TELEPORTER, Labels.POISON, Labels.SAFE]
+             for negative in [False, True]]
+
+def buildProblem(layoutName):
+    from pacman import GameState
+    from logicAgents import LogicSearchProblem
+    theLayout = layout.getLayout(layoutName)
+    if theLayout == None: raise Exception('The layout ' + layoutName + ' cannot be found')
+    state = GameState()
+    state.initialize(theLayout, theLayout.getNumGhosts())
+    return LogicSearchProblem(state, warn=False, visualize=False)
+
+def perceptClauses(problem, state):
+    "The unit clauses of what Pacman senses at a state."
+    return [Clause(Literal(Labels.POISON_FUMES, state, not problem.isPoisonCapsuleClose(state))),
+            Clause(Literal(Labels.WUMPUS_STENCH, state, not problem.isWumpusClose(state))),
+            Clause(Literal(Labels.TELEPORTER_GLOW, state, not problem.isTeleporterClose(state)))]
+
+def visitingOrder(problem, steps):
+    "The first steps cells reachable from the start, in breadth first order."
+    order, frontier = [], [problem.getStartState()]
+    seen = set(frontier)
+    while frontier and len(order) < steps:
+        state = frontier.pop(0)
+        order.append(state)
+        for nextState, action, cost in problem.getSuccessors(state):
+            if nextState not in seen:
+                seen.add(nextState)
+                frontier.append(nextState)
+    return order
+
+def benchmarkLayout(layoutName, engines, steps=3, timeout=10, incremental=False):
+    """
+    Runs the questions of one layout through every engine. Returns the
+    seconds per engine, the number of questions, the number of
+    disagreements, the number of time outs per engine and (with
+    incremental) the (hits, misses) of every engine's KnowledgeBase.
+    """
+    problem = buildProblem(layoutName)
+    clauses = set()
+    util.mutePrint()
+    try: pacard.fillKnowledgeBank(clauses, problem)
+    finally: util.unmutePrint()
+
+    seconds = dict([(engine, 0.0) for engine in engines])
+    timeouts = dict([(engine, 0) for engine in engines])
+    if incremental:
+        knowledgeBases = {}
+        for engine in engines:
+            start = time.time()
+            knowledgeBases[engine] = logic.KnowledgeBase(clauses, engine)
+            seconds[engine] += time.time() - start
+    questions, disagreements = 0, 0
+    for state in visitingOrder(problem, steps):
+        percepts = perceptClauses(problem, state)
+        clauses.update(percepts)
+        if incremental:
+            for engine in engines:
+                start = time.time()
+                knowledgeBases[engine].addClauses(percepts)
+                seconds[engine] += time.time() - start
+        for nextState, action, cost in problem.getSuccessors(state):
+            for label, negative in QUESTIONS:
+                goal = Clause(Literal(label, nextState, negative))
+                answers = set()
+                for engine in engines:
+                    start = time.time()
+                    try:
+                        if incremental:
+                            answer = util.TimeoutFunction(knowledgeBases[engine].entails, timeout)(goal)
+                        else:
+                            answer = util.TimeoutFunction(logic.ENGINES[engine], timeout)(clauses, goal)
+                        answers.add(answer)
+                    except util.TimeoutFunctionException:
+                        timeouts[engine] += 1
+                    seconds[engine] += time.time() - start
+                questions += 1
+                if len(answers) > 1: disagreements += 1
+    lookups = dict([(engine, (0, 0)) for engine in engines])
+    if incremental:
+        for engine in engines:
+            lookups[engine] = (knowledgeBases[engine].hits, knowledgeBases[engine].misses)
+    return seconds, questions, disagreements, timeouts, lookups
+
+def runBenchmark(layouts, engines, steps=3, timeout=10, incremental=False):
+    totals = dict([(engine, 0.0) for engine in engines])
+    hits = dict([(engine, 0) for engine in engines])
+    misses = dict([(engine, 0) for engine in engines])
+    print '%-8s %9s' % ('layout', 'questions') + ''.join(['%18s' % engine for engine in engines]) + '  disagreements'
+    for layoutName in layouts:
+        seconds, questions, disagreements, timeouts, lookups = benchmarkLayout(layoutName, engines, steps, timeout, incremental)
+        row = '%-8s %9d' % (layoutName, questions)
+        for engine in engines:
+            totals[engine] += seconds[engine]
+            hits[engine] += lookups[engine][0]
+            misses[engine] += lookups[engine][1]
+            cell = '%.3fs' % seconds[engine]
+            if timeouts[engine]: cell = '%d t/o %s' % (timeouts[engine], cell)
+            row += '%18s' % cell
+        print row + '  %d' % disagreements
+    print '%-8s %9s' % ('total', '') + ''.join(['%17.3fs' % totals[engine] for engine in engines])
+    if incremental:
+        rates = [100.0 * hits[engine] / max(hits[engine] + misses[engine], 1) for engine in engines]
+        print '%-8s %9s' % ('hit rate', '') + ''.join(['%17.1f%%' % rate for rate in rates])
+    return totals
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE:      python logicBenchmark.py <options>')
+    parser.add_option('-l', '--layouts', dest='layouts', default=','.join(['lay%d' % i for i in range(30)]),
+                      help='Comma separated layouts [Default: lay0 to lay29]')
+    parser.add_option('-e', '--engines', dest='engines', default='resolution,sat',
+                      help='Comma separated engines from logic.ENGINES [Default: %default]')
+    parser.add_option('-s', '--steps', dest='steps', type='int', default=3,
+                      help='Cells visited per layout [Default: %default]')
+    parser.add_option('-t', '--timeout', dest='timeout', type='int', default=10,
+                      help='Seconds before a question is given up [Default: %default]')
+    parser.add_option('-i', '--incremental', action='store_true', dest='incremental', default=False,
+                      help='Ask through a KnowledgeBase kept over the whole layout')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    options.layouts = options.layouts.split(',')
+    options.engines = options.engines.split(',')
+    for engine in options.engines:
+        if engine not in logic.ENGINES: raise Exception('Unknown entailment engine ' + engine)
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    runBenchmark(options.layouts, options.engines, options.steps, options.timeout, options.incremental)
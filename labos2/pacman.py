@@ -526,6 +526,8 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('-e', '--engine', dest='engine',
+                      help=default('The entailment engine of logic.py that PacardAgent uses (see logic.ENGINES)'), default='resolution')
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -535,6 +537,10 @@ def readCommand( argv ):
     # Fix the random seed
     if options.fixRandomSeed: random.seed('cs188')
 
+    # Select the entailment engine before any agent asks logic.entails
+    import logic
+    logic.setEngine(options.engine)
+
     # Choose a layout
     args['layout'] = layout.getLayout( options.layout )
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
@@ -0,0 +1,133 @@
+# proofTrace.py
+# -------------
+"""
+A look inside logic.refutation, for when resolution is slow on a knowledge
+base. A ProofTrace given to logic.setTrace counts, for each refutation:
+
+  givenClauses      steps of the given clause loop
+  pairs             pairs of clauses resolved
+  resolvents        resolvents derived
+  tautologies       resolvents dropped as tautologies
+  forwardSubsumed   resolvents dropped as subsumed by a clause already held
+  backwardSubsumed  clauses removed as subsumed by a new resolvent
+  unitDeletions     literals dropped because a unit clause negates them
+  maxSetOfSupport   the largest the set of support was at any step
+
+With proofs=True it also keeps every clause derived, and the clauses it was
+derived from, so that when the empty clause is derived its proof - the
+clauses the empty clause descends from - can be written as JSON or as a
+Graphviz DOT graph. Both describe only the last refutation.
+
+> python proofTrace.py test/test1.txt -o proof.dot
+> dot -Tpng proof.dot -o proof.png
+"""
+
+import sys
+import util
+import logic
+
+class ProofTrace:
+    def __init__(self, proofs=True):
+        self.proofs = proofs
+        self.counters = util.Counter()
+        self.nodes = {}
+        self.empty = None
+
+    def start(self, setOfSupport):
+        "Called by refutation as it starts, with its initial set of support."
+        self.counters = util.Counter()
+        self.nodes = {}
+        self.empty = None
+        if self.proofs:
+            for clause in setOfSupport:
+                self._addNode(clause, (), 'support')
+
+    def _addNode(self, clause, parents, kind):
+        node = self.nodes.get(clause.codes)
+        if node == None:
+            parentIds = [self._addNode(parent, (), 'premise')['id'] for parent in parents]
+            node = self.nodes[clause.codes] = {'id': len(self.nodes), 'clause': clause,
+                                               'kind': kind, 'parents': parentIds}
+        return node
+
+    def derive(self, clause, parents):
+        "Called by refutation for every clause it keeps, and for the empty clause."
+        if self.proofs:
+            node = self._addNode(clause, parents, 'resolvent')
+            if not clause.codes: self.empty = node
+
+    def getProof(self):
+        """
+        The nodes of the proof of the empty clause, from the premises to the
+        empty clause, or [] if it was not derived. A node is a dictionary of
+        its id, clause, kind ('premise', 'support' for the clauses of the
+        initial set of support, or 'resolvent') and the ids of its parents.
+        """
+        if self.empty == None: return []
+        byId = dict([(node['id'], node) for node in self.nodes.values()])
+        proof, stack = {}, [self.empty['id']]
+        while stack:
+            id = stack.pop()
+            if id in proof: continue
+            proof[id] = byId[id]
+            stack.extend(byId[id]['parents'])
+        return [proof[id] for id in sorted(proof)]
+
+    def _label(self, clause):
+        if not clause.codes: return 'NIL'
+        return ' V '.join(sorted([str(literal) for literal in clause.literals]))
+
+    def toJson(self):
+        import json
+        nodes = [{'id': node['id'], 'clause': self._label(node['clause']), 'kind': node['kind'],
+                  'parents': node['parents']} for node in self.getProof()]
+        return json.dumps({'counters': dict(self.counters), 'proof': nodes}, indent=1, sort_keys=True)
+
+    def toDot(self):
+        shapes = {'premise': 'box', 'support': 'box, style=bold', 'resolvent': 'ellipse'}
+        lines = ['digraph proof {']
+        for node in self.getProof():
+            lines.append('  n%d [label="%s", shape=%s];' % (node['id'], self._label(node['clause']), shapes[node['kind']]))
+            for parent in node['parents']:
+                lines.append('  n%d -> n%d;' % (parent, node['id']))
+        lines.append('}')
+        return '\n'.join(lines)
+
+    def writeJson(self, path):
+        f = open(path, 'w')
+        try: f.write(self.toJson() + '\n')
+        finally: f.close()
+
+    def writeDot(self, path):
+        f = open(path, 'w')
+        try: f.write(self.toDot() + '\n')
+        finally: f.close()
+
+    def __str__(self):
+        return ', '.join(['%s %d' % (name, self.counters[name]) for name in sorted(self.counters)])
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE:      python proofTrace.py <options> <test or .cnf file>')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write the proof to this file, as DOT if it ends in .dot and JSON otherwise')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 1:
+        raise Exception('Give exactly one test or .cnf file, not: ' + str(otherjunk))
+    options.path = otherjunk[0]
+    return options
+
+if __name__ == '__main__':
+    import dimacs
+    options = readCommand(sys.argv[1:])
+    if options.path.endswith('.cnf'):
+        premises, goal = dimacs.readDimacs(options.path), logic.Clause([])
+    else:
+        solution, premises, goal = dimacs.readTest(options.path)
+    trace = logic.setTrace(ProofTrace())
+    print 'Entailed:', logic.resolution(set(premises), goal)
+    print trace
+    print len(trace.getProof()), 'clauses in the proof'
+    if options.output != None:
+        if options.output.endswith('.dot'): trace.writeDot(options.output)
+        else: trace.writeJson(options.output)
@@ -0,0 +1,248 @@
+# satSolver.py
+# ------------
+"""
+A compact CDCL (conflict-driven clause learning) SAT solver, used by
+logic.satResolution to answer entailment questions: the clauses entail a
+goal exactly when the clauses together with the negation of the goal cannot
+be satisfied.
+
+Literals are the integer codes of logic.literalCode: variable ids, negated
+for negative literals. The solver uses
+
+  watched literals    every clause of two or more literals watches two of
+                      them and is only looked at when one becomes false
+  unit propagation    the literals that clauses force are assigned before
+                      the next decision
+  clause learning     a conflict is analysed back to its first unique
+                      implication point; the learned clause is kept and the
+                      search jumps back to the level where it asserts
+  activity branching  variables that take part in conflicts are decided
+                      first, and decisions try the negative value first
+                      (most Wumpus world facts are false)
+
+Clauses can be added between calls to solve, and solve takes assumptions,
+literals that are taken as true for one call only. Learned clauses follow
+from the clauses alone, so they are kept from one call to the next.
+
+>>> solver = SATSolver()
+>>> solver.addClause([1, -2])
+>>> solver.addClause([2])
+>>> solver.solve()            # True, satisfiable
+>>> solver.solve([-1])        # False, so the clauses entail 1
+"""
+
+class SATSolver:
+    """
+    The solver's state between calls is its clauses and the assignment made
+    at decision level 0 (the literals that the clauses force by themselves).
+    """
+    def __init__(self):
+        self.clauses = []
+        self.learned = []
+        self.watches = {}
+        self.true = set()
+        self.level = {}
+        self.reason = {}
+        self.trail = []
+        self.trailLimits = []
+        self.propagated = 0
+        self.activity = {}
+        self.bump = 1.0
+        self.variables = set()
+        self.unsatisfiable = False
+        self.conflicts = 0
+        self.decisions = 0
+        self.resolutions = 0
+
+    def isTrue(self, literal):
+        return literal in self.true
+
+    def isFalse(self, literal):
+        return -literal in self.true
+
+    def getLevel(self):
+        return len(self.trailLimits)
+
+    def addClause(self, literals):
+        """
+        Add a clause (an iterable of literal codes). Returns False if the
+        clauses have become unsatisfiable.
+        """
+        if self.unsatisfiable: return False
+        self._cancelUntil(0)
+        literals = set(literals)
+        clause = []
+        for literal in literals:
+            if -literal in literals or self.isTrue(literal):
+                # A tautology, or satisfied for good at level 0
+                return True
+            self.variables.add(abs(literal))
+            self.activity.setdefault(abs(literal), 0.0)
+            if not self.isFalse(literal):
+                clause.append(literal)
+        if not clause:
+            self.unsatisfiable = True
+            return False
+        if len(clause) == 1:
+            self._assign(clause[0], None)
+            if self._propagate() != None:
+                self.unsatisfiable = True
+                return False
+            return True
+        self.clauses.append(clause)
+        self._watch(clause)
+        return True
+
+    def _watch(self, clause):
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def _assign(self, literal, reason):
+        self.true.add(literal)
+        self.level[abs(literal)] = len(self.trailLimits)
+        self.reason[abs(literal)] = reason
+        self.trail.append(literal)
+
+    def _cancelUntil(self, level):
+        "Undo the assignments of all decision levels above level."
+        if len(self.trailLimits) <= level: return
+        start = self.trailLimits[level]
+        for literal in self.trail[start:]:
+            self.true.discard(literal)
+        del self.trail[start:]
+        del self.trailLimits[level:]
+        self.propagated = len(self.trail)
+
+    def _propagate(self):
+        """
+        Assign the literals forced by unit clauses until nothing changes.
+        Returns a conflicting clause, or None.
+        """
+        true = self.true
+        while self.propagated < len(self.trail):
+            falseLiteral = -self.trail[self.propagated]
+            self.propagated += 1
+            watchers = self.watches.get(falseLiteral, [])
+            kept = self.watches[falseLiteral] = []
+            for i in range(len(watchers)):
+                clause = watchers[i]
+                if clause[0] == falseLiteral:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if first in true:
+                    kept.append(clause)
+                    continue
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if -clause[k] not in true:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if -first in true:
+                        kept.extend(watchers[i + 1:])
+                        self.propagated = len(self.trail)
+                        return clause
+                    self._assign(first, clause)
+        return None
+
+    def _analyze(self, conflict):
+        """
+        Derive the first-UIP clause of a conflict. Returns the learned clause,
+        its asserting literal first, and the level to jump back to.
+        """
+        seen = set()
+        learned = [None]
+        level = self.getLevel()
+        pending = 0
+        literal = None
+        clause = conflict
+        index = len(self.trail) - 1
+        while True:
+            for other in clause:
+                if other == literal: continue
+                variable = abs(other)
+                if variable in seen or self.level[variable] == 0: continue
+                seen.add(variable)
+                self.activity[variable] += self.bump
+                if self.level[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0: break
+            clause = self.reason[abs(literal)]
+            self.resolutions += 1
+        learned[0] = -literal
+
+        backLevel = 0
+        if len(learned) > 1:
+            # Watch the literal of the highest level as the second one
+            best = max(range(1, len(learned)), key=lambda i: self.level[abs(learned[i])])
+            learned[1], learned[best] = learned[best], learned[1]
+            backLevel = self.level[abs(learned[1])]
+        self.bump *= 1.05
+        return learned, backLevel
+
+    def _pickBranch(self):
+        best, bestActivity = None, -1.0
+        for variable in self.variables:
+            if variable in self.true or -variable in self.true: continue
+            if self.activity[variable] > bestActivity:
+                best, bestActivity = variable, self.activity[variable]
+        return best
+
+    def solve(self, assumptions=()):
+        """
+        Check whether the clauses can be satisfied with all the assumptions
+        true. Returns True if they can, False otherwise.
+        """
+        if self.unsatisfiable: return False
+        self._cancelUntil(0)
+        if self._propagate() != None:
+            self.unsatisfiable = True
+            return False
+        assumptions = list(assumptions)
+        try:
+            while True:
+                conflict = self._propagate()
+                if conflict != None:
+                    self.conflicts += 1
+                    if self.getLevel() == 0:
+                        self.unsatisfiable = True
+                        return False
+                    if self.getLevel() <= len(assumptions):
+                        # Only assumptions have been decided
+                        return False
+                    learned, backLevel = self._analyze(conflict)
+                    self._cancelUntil(backLevel)
+                    if len(learned) == 1:
+                        self._assign(learned[0], None)
+                    else:
+                        self.learned.append(learned)
+                        self._watch(learned)
+                        self._assign(learned[0], learned)
+                    continue
+
+                if self.getLevel() < len(assumptions):
+                    literal = assumptions[self.getLevel()]
+                    if self.isFalse(literal):
+                        return False
+                    self.trailLimits.append(len(self.trail))
+                    if not self.isTrue(literal):
+                        self._assign(literal, None)
+                    continue
+
+                variable = self._pickBranch()
+                if variable == None:
+                    return True
+                self.decisions += 1
+                self.trailLimits.append(len(self.trail))
+                self._assign(-variable, None)
+        finally:
+            self._cancelUntil(0)